@@ -1,152 +1,333 @@
 # ai_feedback.py
+import logging
 import os
-import google.generativeai as genai
+import threading
+import time
+
 import streamlit as st  # Import Streamlit to use st.error, st.secrets, etc.
-import pkg_resources  # Import pkg_resources to check package version
-
-# --- DEBUG: Print installed google-generativeai version ---
-try:
-    installed_gemini_version = pkg_resources.get_distribution("google-generativeai").version
-    st.info(f"DEBUG: google-generativeai version detected: {installed_gemini_version}")
-    print(f"DEBUG (Terminal): google-generativeai version detected: {installed_gemini_version}")
-except pkg_resources.DistributionNotFound:
-    st.error("DEBUG: google-generativeai package not found by pkg_resources in this environment.")
-    print("DEBUG (Terminal): google-generativeai package not found by pkg_resources in this environment.")
-except Exception as e:
-    st.error(f"DEBUG: Error getting google-generativeai version: {e}")
-    print(f"DEBUG (Terminal): Error getting google-generativeai version: {e}")
-# --------------------------------------------------------
-
-
-# Configure the Gemini API with your key
-api_key = None  # Initialize api_key to None
-
-try:
-    # First, try to get the key from Streamlit secrets (for Streamlit Cloud deployment)
-    # Wrap in a try-except to handle cases where secrets.toml doesn't exist locally
-    st.info("Attempting to retrieve API key from Streamlit secrets...")
-    try:
-        api_key = st.secrets.get("GEMINI_API_KEY", None)  # Added default None to avoid KeyError if key not in secrets
-        if api_key:
-            st.info("API key found in Streamlit secrets.")
-        else:
-            st.warning("API key NOT found in Streamlit secrets (key missing or empty).")
-    except Exception as e:
-        # Catch any exception related to st.secrets.get() (e.g., FileNotFoundError if .streamlit/secrets.toml is missing)
-        st.warning(
-            f"An error occurred while checking Streamlit secrets (likely secrets.toml not found locally): {e}. Falling back to environment variables.")
-
-    # If not found in secrets (or an error occurred), try to get it from environment variables
-    if not api_key:
-        st.info("Attempting to retrieve API key from environment variables...")
-        api_key = os.getenv("GEMINI_API_KEY")
-        if api_key:
-            st.info("API key found in environment variables.")
-        else:
-            st.error("API key NOT found in environment variables either.")
-
-    # If after both attempts, API key is still not found, stop the app
-    if not api_key:
-        st.error("🚨 GEMINI_API_KEY not found! Please set it up correctly.")
-        st.markdown("For **local development**: Set `GEMINI_API_KEY` as a system/user environment variable.")
-        st.markdown("For **Streamlit Cloud deployment**: Add `GEMINI_API_KEY` to your app's secrets.")
-        st.stop()  # Stop the Streamlit app execution if API key is missing
-
-    # If API key is found, proceed with configuration
-    st.info("Configuring Gemini API...")
-    genai.configure(api_key=api_key)
-    st.success("Gemini API configured successfully!")
-
-    # --- DEBUG: List available models (Keeping this here for now, good info) ---
-    print("\n--- DEBUG: Listing available Gemini models and their supported methods ---")
-    st.info("DEBUG: Listing available Gemini models...")
-    found_gemini_pro_candidate = False
-    try:
-        for m in genai.list_models():
-            if "generateContent" in m.supported_generation_methods:
-                model_info = f"Model: {m.name}, Supported methods: {m.supported_generation_methods}"
-                print(f"  {model_info}")
-                # We can update this check to look for flash models too if needed for debug message
-                if "gemini-1.5-pro" in m.name or "gemini-2.5-pro" in m.name or "gemini-1.5-flash" in m.name:
-                    found_gemini_pro_candidate = True
-                    st.success(f"DEBUG: Found {m.name} with generateContent support!")
-    except Exception as e:
-        print(f"  Error listing models: {e}")
-        st.error(f"DEBUG: Error listing models: {e}")
+from feedback_cache import get_feedback_cache, make_cache_key
+from llm_backends import (DEFAULT_GEMINI_MODEL, BlockedContentError, GeminiBackend, configured_backend_name,
+                          create_backend)
+from semantic_cache import get_semantic_cache
+from telemetry import increment, log_event, observe, span
+from token_usage import get_usage_tracker
 
-    if not found_gemini_pro_candidate:
-        st.warning(
-            "DEBUG: No suitable 'gemini-pro' or 'gemini-1.5-flash' candidate model found with 'generateContent' support for this API key.")
-        print(
-            "DEBUG (Terminal): No suitable 'gemini-pro' or 'gemini-1.5-flash' candidate model found with 'generateContent' support for this API key.")
-    print("--- DEBUG: End of model list ---")
-    # ----------------------------------------
+MODEL_NAME = os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL)
+# Bump this whenever the prompt below changes so cached feedback from the old prompt isn't reused
+PROMPT_VERSION = "v2"
+COMPACT_PROMPT_VERSION = "v2-compact"
+STRUCTURED_PROMPT_VERSION = "v1-json"
 
-except Exception as e:
-    # This outer try-except catches any remaining unexpected errors during the entire configuration block
-    st.error(f"❌ An unexpected critical error occurred during API key configuration: {e}.")
-    st.markdown("Please double-check your API key validity and system setup.")
-    st.stop()
+# "full" sends the original self-contained prompt on every call; "compact" moves the rubric and
+# format instructions into a fixed system instruction and sends only the question and answer.
+PROMPT_STYLE = os.getenv("FEEDBACK_PROMPT_STYLE", "full").strip().lower()
 
+# Evaluation criteria shared by the markdown and the JSON (structured) prompts
+RUBRIC = """\
+        - **Communication Clarity:** Is the answer easy to understand? Is the language precise and free of jargon (unless appropriate for the context)?
+        - **Answer Structure:** Is the answer well-organized (e.g., using STAR method for behavioral questions)? Does it have a clear beginning, middle, and end, making it easy to follow?
+        - **Professional Tone:** Is the tone appropriate for a professional interview? Is it confident, respectful, and enthusiastic without being overly casual or arrogant?
+        - **Completeness/Relevance:** Does the answer fully address all parts of the question? Is it relevant to the question asked, avoiding unnecessary tangents?
+        - **Technical Coverage (optional):** If the question explicitly or implicitly asks for technical details (e.g., "Explain polymorphism in Python" or "Describe a technical challenge"), does the answer demonstrate sufficient and accurate technical understanding? State "Not applicable" if the question is not technical."""
 
-def get_gemini_feedback(user_input, question_asked):
+# Fixed part of the compact prompt. It's identical for every call, so it is sent as the system
+# instruction (one GenerativeModel per instruction is reused by the backend) instead of being
+# re-sent inside every prompt. Unlike the full prompt it has no example block and names the question once.
+COMPACT_SYSTEM_INSTRUCTION = """\
+You are an AI interview coach giving constructive, actionable feedback on interview answers.
+Evaluate the answer on these criteria, one bullet each, formatted as "- **Criterion:** (n/5) feedback"
+where n is a score from 1 (poor) to 5 (excellent):
+- **Communication Clarity:** easy to understand; precise language, no needless jargon.
+- **Answer Structure:** well organized (e.g. STAR for behavioral questions) with a clear beginning, middle and end.
+- **Professional Tone:** confident, respectful and enthusiastic, neither too casual nor arrogant.
+- **Completeness/Relevance:** addresses every part of the question without tangents.
+- **Technical Coverage:** accurate and sufficient technical depth if the question asks for it, otherwise "Not applicable" without a score.
+Then add "**Suggestion for Improvement:**" followed by one specific, actionable bullet for the next answer."""
+
+# Nothing below talks to the network or imports the Gemini SDK at import time.
+# Streamlit re-executes app.py on every interaction, so the backend is created lazily,
+# once per process, the first time feedback is actually requested.
+_backend = None
+_init_lock = threading.Lock()
+
+
+def resolve_api_key():
     """
-    Sends the user's answer to the Gemini Pro model and gets structured feedback.
+    Looks up GEMINI_API_KEY in Streamlit secrets first (Streamlit Cloud), then in environment variables (local).
+    Returns None if neither is set.
     """
+    api_key = None
     try:
-        # CHANGED: Model name to 'models/gemini-1.5-flash'
-        model = genai.GenerativeModel('models/gemini-1.5-flash')
+        api_key = st.secrets.get("GEMINI_API_KEY", None)
+    except Exception:
+        # st.secrets raises if .streamlit/secrets.toml doesn't exist locally; fall back to the environment
+        pass
+    return api_key or os.getenv("GEMINI_API_KEY")
+
 
-        prompt = f"""
+def get_backend():
+    """
+    Returns the process-wide LLM backend selected by LLM_BACKEND (Gemini by default, see llm_backends.py).
+    """
+    global _backend
+    if _backend is None:
+        with _init_lock:
+            if _backend is None:
+                if configured_backend_name() == "gemini":
+                    _backend = GeminiBackend(model_name=MODEL_NAME, api_key=resolve_api_key())
+                else:
+                    _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Replaces the process-wide backend, e.g. with a StubBackend in benchmarks.
+    """
+    global _backend
+    with _init_lock:
+        _backend = backend
+
+
+def check_gemini_health():
+    """
+    Explicit health check (the old import-time debug block): reports whether the configured
+    backend is usable; for Gemini this includes the SDK version and the available models.
+    This lists models over the network, so call it on demand, never on every rerun.
+    """
+    return get_backend().health_check()
+
+
+def build_feedback_prompt(user_input, question_asked):
+    """
+    Builds the evaluation prompt. Shared by the Streamlit app and the offline batch grader.
+    """
+    return f"""
         You are an AI interview coach. Your goal is to provide constructive and actionable feedback on interview answers.
 
         The question asked was: "{question_asked}"
         The user's answer was: "{user_input}"
 
         Evaluate the user's answer based on the following criteria:
-        - **Communication Clarity:** Is the answer easy to understand? Is the language precise and free of jargon (unless appropriate for the context)?
-        - **Answer Structure:** Is the answer well-organized (e.g., using STAR method for behavioral questions)? Does it have a clear beginning, middle, and end, making it easy to follow?
-        - **Professional Tone:** Is the tone appropriate for a professional interview? Is it confident, respectful, and enthusiastic without being overly casual or arrogant?
-        - **Completeness/Relevance:** Does the answer fully address all parts of the question? Is it relevant to the question asked, avoiding unnecessary tangents?
-        - **Technical Coverage (optional):** If the question explicitly or implicitly asks for technical details (e.g., "Explain polymorphism in Python" or "Describe a technical challenge"), does the answer demonstrate sufficient and accurate technical understanding? State "Not applicable" if the question is not technical.
+{RUBRIC}
 
         Provide feedback in a structured format with clear bullet points for each criterion.
+        Start each bullet with a score from 1 (poor) to 5 (excellent) written as (n/5); leave the score out if a criterion is "Not applicable".
         After the bullet points, provide one specific, actionable suggestion for improvement that the user can apply to their next answer.
 
         Example Feedback Format:
         **Feedback for "{question_asked}"**
-        - **Communication Clarity:** The answer was mostly clear, but there were a few vague phrases.
-        - **Answer Structure:** The structure was a bit disjointed; a more clear introduction and conclusion would help.
-        - **Professional Tone:** The tone was generally professional, but could use a bit more enthusiasm.
-        - **Completeness/Relevance:** The answer covered the main points, but missed one key aspect of the question.
-        - **Technical Coverage:** The technical explanation was accurate but lacked depth in one area.
+        - **Communication Clarity:** (4/5) The answer was mostly clear, but there were a few vague phrases.
+        - **Answer Structure:** (2/5) The structure was a bit disjointed; a more clear introduction and conclusion would help.
+        - **Professional Tone:** (4/5) The tone was generally professional, but could use a bit more enthusiasm.
+        - **Completeness/Relevance:** (3/5) The answer covered the main points, but missed one key aspect of the question.
+        - **Technical Coverage:** (3/5) The technical explanation was accurate but lacked depth in one area.
 
         **Suggestion for Improvement:**
         - Try to use the STAR method (Situation, Task, Action, Result) for behavioral questions to ensure a well-structured and complete answer.
         """
 
+
+def build_compact_feedback_prompt(user_input, question_asked):
+    """
+    Per-call part of the compact prompt; the rubric is in COMPACT_SYSTEM_INSTRUCTION.
+    """
+    return f'Question: "{question_asked}"\nAnswer: "{user_input}"'
+
+
+def build_feedback_request(user_input, question_asked, style=None):
+    """
+    Returns (prompt, system_instruction, prompt_version) for the given prompt style
+    (default: FEEDBACK_PROMPT_STYLE). The version keeps cache entries of the two styles apart.
+    """
+    style = style or PROMPT_STYLE
+    if style == "compact":
+        return build_compact_feedback_prompt(user_input, question_asked), COMPACT_SYSTEM_INSTRUCTION, \
+            COMPACT_PROMPT_VERSION
+    if style == "full":
+        return build_feedback_prompt(user_input, question_asked), None, PROMPT_VERSION
+    raise ValueError(f"Unknown prompt style '{style}'. Expected 'full' or 'compact'.")
+
+
+def get_token_usage():
+    """
+    Cumulative token usage and estimated cost per model since the process started.
+    """
+    return get_usage_tracker().snapshot()
+
+
+def build_structured_feedback_prompt(user_input, question_asked):
+    """
+    Builds the evaluation prompt for JSON output, parsed into a FeedbackResult by feedback_results.parse_feedback.
+    """
+    return f"""
+        You are an AI interview coach. Evaluate the interview answer below.
+
+        The question asked was: "{question_asked}"
+        The user's answer was: "{user_input}"
+
+        Criteria:
+{RUBRIC}
+
+        Respond with a single JSON object and nothing else, using exactly these keys:
+        {{"communication_clarity": {{"score": 1-5, "comment": "..."}},
+          "answer_structure": {{"score": 1-5, "comment": "..."}},
+          "professional_tone": {{"score": 1-5, "comment": "..."}},
+          "completeness_relevance": {{"score": 1-5, "comment": "..."}},
+          "technical_coverage": {{"score": 1-5 or null if not applicable, "comment": "..."}},
+          "suggestion": "one specific, actionable suggestion for the next answer"}}
+        Scores: 1 = poor, 3 = adequate, 5 = excellent. Keep each comment to one sentence.
+        """
+
+
+def get_gemini_feedback(user_input, question_asked, usage=None):
+    """
+    Sends the user's answer to the Gemini Pro model and gets structured feedback.
+    If a dict is passed as `usage`, it is filled with the call's token counts and estimated cost.
+    """
+    with span("prompt_build"):
+        prompt, system_instruction, prompt_version = build_feedback_request(user_input, question_asked)
+
+    # Identical (question, answer) pairs are graded once and then served from the cache
+    backend = get_backend()
+    cache = get_feedback_cache()
+    cache_key = make_cache_key(backend.model_name, prompt_version, question_asked, user_input)
+    if cache is not None:
+        cached_feedback = cache.get(cache_key)
+        if cached_feedback is not None:
+            increment("feedback_served_total", source="cache")
+            return cached_feedback
+    # Near-identical answers to the same question reuse the earlier feedback (SEMANTIC_CACHE=1)
+    semantic = get_semantic_cache()
+    if semantic is not None:
+        reused = semantic.lookup(backend.model_name, prompt_version, question_asked, user_input)
+        if reused is not None:
+            increment("feedback_served_total", source="semantic")
+            return reused[0]
+
+    try:
         # Removed 'timeout=120'
-        response = model.generate_content(prompt)
+        with span("llm_call"):
+            response_text = backend.generate(prompt, system_instruction, usage=usage)
 
-        if response.text:  # Check if response.text is not empty or None
-            return response.text
+        if response_text:  # Check if the response text is not empty or None
+            increment("feedback_served_total", source="model")
+            # Only real feedback is cached; errors and empty responses are retried next time
+            if cache is not None:
+                cache.set(cache_key, response_text)
+            if semantic is not None:
+                semantic.add(backend.model_name, prompt_version, question_asked, user_input, response_text)
+            return response_text
         else:
-            # If response.text is empty, but no exception was raised, something else went wrong
+            # If the response is empty, but no exception was raised, something else went wrong
             st.warning(
                 "Gemini returned an empty response. This might indicate an issue with the prompt or model availability.")
-            # Also print the full response object to the console for more info
-            print("Gemini API returned an empty text response. Full response object:", response)
+            log_event("empty_response", level=logging.WARNING, backend=backend.name)
             return "No feedback could be generated. Gemini returned an empty response. Please try again."
 
-    except genai.types.BlockedPromptException as e:
+    except Exception as e:
+        return _report_feedback_error(e)
+
+
+def _report_feedback_error(e):
+    """
+    Shows the appropriate Streamlit error for a failed Gemini call and returns the message stored as feedback.
+    """
+    if isinstance(e, BlockedContentError):
+        increment("blocked_prompts_total")
         # Catch specific content policy violations
         st.error(f"❌ Gemini API blocked the prompt or response due to content policy: {e}")
         st.info("This usually happens if the input or generated content violates safety guidelines.")
         return "Feedback generation blocked due to content policy. Please try rephrasing your answer."
+    # Catch any other general exceptions during the API call
+    st.error(
+        f"❌ An error occurred while communicating with Gemini API: {e}. Please check your internet connection or try again.")
+    st.info(
+        "Possible causes: network issue, invalid API key (though found, might be revoked/incorrect), or model capacity.")
+    return f"An error occurred while getting feedback: {e}"
+
+
+def stream_gemini_feedback(user_input, question_asked, timings=None):
+    """
+    Streaming variant of get_gemini_feedback: yields the feedback in chunks as Gemini generates it,
+    so the UI can render text before the full response is ready.
+    If a dict is passed as `timings`, it is filled with time-to-first-token ("ttft_s"),
+    total time ("total_s"), the number of chunks, whether the answer came from the cache
+    (with "similarity" set if it was reused from a near-identical answer)
+    and the call's token usage ("input_tokens", "output_tokens", "cost_usd").
+    """
+    if timings is None:
+        timings = {}
+    start = time.perf_counter()
+    timings.update(ttft_s=None, total_s=None, chunks=0, cached=False, similarity=None,
+                   input_tokens=0, output_tokens=0, cost_usd=0.0)
+    with span("prompt_build"):
+        prompt, system_instruction, prompt_version = build_feedback_request(user_input, question_asked)
+
+    def record(chunk):
+        if timings["ttft_s"] is None:
+            timings["ttft_s"] = time.perf_counter() - start
+        timings["chunks"] += 1
+        return chunk
+
+    backend = get_backend()
+    cache = get_feedback_cache()
+    cache_key = make_cache_key(backend.model_name, prompt_version, question_asked, user_input)
+    cached_feedback = cache.get(cache_key) if cache is not None else None
+    semantic = get_semantic_cache()
+    if cached_feedback is None and semantic is not None:
+        reused = semantic.lookup(backend.model_name, prompt_version, question_asked, user_input)
+        if reused is not None:
+            cached_feedback, timings["similarity"] = reused
+    if cached_feedback is not None:
+        timings["cached"] = True
+        increment("feedback_served_total", source="cache" if timings["similarity"] is None else "semantic")
+        yield record(cached_feedback)
+        timings["total_s"] = time.perf_counter() - start
+        return
+
+    parts = []
+    usage = {}
+    call_start = time.perf_counter()
+    try:
+        for text in backend.stream(prompt, system_instruction, usage=usage):
+            if text:
+                parts.append(text)
+                yield record(text)
+
+        if parts:
+            increment("feedback_served_total", source="model")
+            if cache is not None:
+                cache.set(cache_key, "".join(parts))
+            if semantic is not None:
+                semantic.add(backend.model_name, prompt_version, question_asked, user_input, "".join(parts))
+        else:
+            st.warning(
+                "Gemini returned an empty response. This might indicate an issue with the prompt or model availability.")
+            yield record("No feedback could be generated. Gemini returned an empty response. Please try again.")
     except Exception as e:
-        # Catch any other general exceptions during the API call
-        st.error(
-            f"❌ An error occurred while communicating with Gemini API: {e}. Please check your internet connection or try again.")
-        st.info(
-            "Possible causes: network issue, invalid API key (though found, might be revoked/incorrect), or model capacity.")
-        return f"An error occurred while getting feedback: {e}"
\ No newline at end of file
+        increment("errors_total", stage="llm_call", error=type(e).__name__)
+        # Anything already streamed stays on screen; the error message is appended after it
+        yield record(("\n\n" if parts else "") + _report_feedback_error(e))
+    finally:
+        timings["total_s"] = time.perf_counter() - start
+        timings.update((k, usage[k]) for k in ("input_tokens", "output_tokens", "cost_usd") if k in usage)
+        observe("llm_call", time.perf_counter() - call_start)
+        if parts:
+            observe("llm_first_token", timings["ttft_s"])
+        if timings["ttft_s"] is not None:
+            log_event("feedback_streamed", backend=backend.name, chunks=timings["chunks"],
+                      ttft_s=round(timings["ttft_s"], 3), total_s=round(timings["total_s"], 3),
+                      input_tokens=timings["input_tokens"], output_tokens=timings["output_tokens"])
+
+
+if __name__ == "__main__":
+    # python ai_feedback.py -> prints the health check without starting the app
+    health = check_gemini_health()
+    print(f"Backend: {health['backend']}, model: {health['model']} (available: {health['ok']})")
+    if "sdk_version" in health:
+        print(f"google-generativeai version: {health['sdk_version']}")
+    for name in health.get("models", []):
+        print(f"  {name}")
+    if health["error"]:
+        print(f"Error: {health['error']}")
@@ -1,10 +1,217 @@
 # app.py
+import os
+import time
+import uuid
+
 import streamlit as st
-import random
-import os  # Import os to check for API key
-from ai_feedback import get_gemini_feedback
+from ai_feedback import resolve_api_key, stream_gemini_feedback
+from feedback_results import FeedbackResult, parse_feedback
+from llm_backends import configured_backend_name
+from question_bank import QuestionSession, load_question_bank, weakness_weights
 from questions import sample_questions
-from voice_input import get_voice_input, speak_text
+from rerun_stats import get_rerun_stats
+from session_store import get_session_store
+from telemetry import log_event, observe, start_exporters
+from voice_input import prefetch_speech, report_voice_capture, speak_text, start_voice_capture, stop_speaking
+
+# The answer/feedback flow is a small state machine kept in st.session_state.stage:
+#   "answering" -> (submit) -> "grading" -> (feedback streamed) -> "reviewing" -> (next question) -> "answering"
+# Buttons change state in on_click callbacks, which Streamlit runs before the script,
+# so every action costs exactly one script run instead of a run plus an st.rerun().
+
+# Saved to the session store (if one is configured) after every run
+PERSISTED_KEYS = ("current_question", "user_answer", "feedback", "feedback_timing", "mode", "stage",
+                  "category_filter", "difficulty_filter")
+
+start_exporters()  # METRICS_PORT / METRICS_FILE, once per process
+run_started = time.perf_counter()
+run_action = st.session_state.pop("last_action", "other")  # Set by the callback that caused this run
+get_rerun_stats().start_run(run_action)
+
+
+def format_feedback_timing(timings):
+    """
+    One-line summary of how long the last feedback took, shown under the feedback.
+    """
+    if timings.get("similarity") is not None:
+        return f"⚡ Reused feedback of a near-identical answer ({timings['similarity']:.0%} similar)"
+    if timings.get("cached"):
+        return f"⚡ Served from cache in {timings['total_s']:.2f}s"
+    if timings.get("ttft_s") is None:
+        return ""
+    summary = f"⏱️ First words after {timings['ttft_s']:.2f}s · full feedback in {timings['total_s']:.2f}s"
+    if timings.get("input_tokens"):
+        summary += f" · {timings['input_tokens']} input / {timings['output_tokens']} output tokens"
+    return summary
+
+
+@st.cache_resource
+def get_question_bank():
+    """
+    Loads the question bank once per process (QUESTION_BANK_PATH or data/questions.jsonl),
+    falling back to the built-in sample questions.
+    """
+    return load_question_bank(fallback_texts=sample_questions)
+
+
+def selected_filters():
+    """
+    (category, difficulty) from the sidebar filters, None meaning "All".
+    """
+    category = st.session_state.get("category_filter", "All")
+    difficulty = st.session_state.get("difficulty_filter", "All")
+    return None if category == "All" else category, None if difficulty == "All" else difficulty
+
+
+def start_question_session(category=None, difficulty=None):
+    """
+    Starts a shuffled, non-repeating pass over the questions matching the filters.
+    """
+    st.session_state.question_session = QuestionSession(get_question_bank(), category=category, difficulty=difficulty)
+
+
+def next_question():
+    """
+    Picks the next question, favouring criteria the user scored lowest on so far.
+    """
+    weights = weakness_weights(st.session_state.scored_feedback)
+    st.session_state.current_question = st.session_state.question_session.next(weights=weights).text
+
+
+def record_action(name):
+    """
+    Attributes the script run that follows this callback to `name` in the rerun stats.
+    """
+    st.session_state.last_action = name
+    get_rerun_stats().action(name)
+
+
+def reset_answer():
+    st.session_state.user_answer = ""
+    st.session_state.text_input_area = ""
+    st.session_state.feedback = ""
+    st.session_state.feedback_timing = {}
+    st.session_state.stage = "answering"
+
+
+# --- Callbacks (run before the script, so no st.rerun() is needed) ---
+def apply_question_filters():
+    record_action("filter")
+    start_question_session(*selected_filters())
+    if len(st.session_state.question_session):
+        next_question()
+        reset_answer()
+    # Otherwise the current question stays and the sidebar shows a warning
+
+
+def switch_mode(mode):
+    record_action("switch_mode")
+    st.session_state.mode = mode
+    reset_answer()  # Clear previous answer and feedback when switching mode
+
+
+def start_recording():
+    record_action("start_recording")
+    reset_answer()  # Clear previous recording info
+    st.session_state.voice_capture = start_voice_capture()  # Returns immediately
+
+
+def stop_recording():
+    record_action("stop_recording")
+    if st.session_state.voice_capture is not None:
+        st.session_state.voice_capture.stop()  # Whatever was said so far is still transcribed
+
+
+def submit_answer():
+    record_action("submit")
+    if st.session_state.mode == "text":
+        st.session_state.user_answer = st.session_state.text_input_area  # Save the text input to session state
+    if st.session_state.user_answer.strip():
+        st.session_state.stage = "grading"
+
+
+def go_to_next_question():
+    record_action("next_question")
+    next_question()
+    reset_answer()
+    st.session_state.mode = "text"  # Reset mode for new question by default
+
+
+def restore_session():
+    """
+    On the first run of a browser session, takes the session id from the URL (or creates one)
+    and loads the saved state from the session store, so a refresh keeps the practice session.
+    """
+    store = get_session_store()
+    if store is None or "session_id" in st.session_state:
+        return
+    session_id = st.query_params.get("sid") or uuid.uuid4().hex
+    st.query_params["sid"] = session_id
+    st.session_state.session_id = session_id
+    data = store.load(session_id)
+    if not data:
+        return
+    for key in PERSISTED_KEYS:
+        if key in data:
+            st.session_state[key] = data[key]
+    st.session_state.text_input_area = data.get("user_answer", "")
+    st.session_state.scored_feedback = [FeedbackResult.from_row(row) for row in data.get("scored_feedback", ())]
+    start_question_session(*selected_filters())
+
+
+def save_session():
+    """
+    Writes the persisted keys to the session store, skipping the write if nothing changed.
+    """
+    store = get_session_store()
+    if store is None:
+        return
+    data = {key: st.session_state.get(key) for key in PERSISTED_KEYS}
+    data["scored_feedback"] = [result.to_row() for result in st.session_state.scored_feedback]
+    if data != st.session_state.get("saved_session"):
+        store.save(st.session_state.session_id, data)
+        st.session_state.saved_session = data
+
+
+def render_rerun_stats():
+    with st.sidebar.expander("⚙️ Rerun stats"):
+        for name, stats in sorted(get_rerun_stats().snapshot().items()):
+            per_action = f"{stats['runs_per_action']:.1f} runs/action" if stats["runs_per_action"] else ""
+            mean = f"{stats['mean_run_ms']:.0f} ms/run" if stats["mean_run_ms"] is not None else ""
+            st.write(f"**{name}**: {stats['runs']} runs {per_action} {mean}")
+
+
+def render_read_aloud_controls():
+    """
+    Read-aloud buttons for the feedback. Speech plays in the background, so the page stays usable.
+    """
+    read_col, stop_col = st.columns([3, 1])
+    with read_col:
+        if st.button("🔊 Read Feedback Aloud", use_container_width=True):
+            speak_text(st.session_state.feedback)
+    with stop_col:
+        if st.button("⏹️ Stop", use_container_width=True):
+            stop_speaking()
+
+
+@st.fragment(run_every=0.5)
+def show_voice_capture_status():
+    """
+    Polls the background recording twice a second without rerunning the whole page;
+    once the transcript (or an error) is in, reruns the app to pick it up.
+    """
+    capture = st.session_state.voice_capture
+    if capture is None or capture.finished:
+        record_action("voice_capture_done")
+        st.rerun()
+    elif capture.state == "processing":
+        st.info("🧠 Processing speech...")
+    elif capture.state in ("calibrating", "listening"):
+        st.info("👂 Listening... Please speak clearly into your microphone.")
+    else:
+        st.info(f"🎙️ Recording... ({capture.segments} segments transcribing in the background). "
+                "Pause for a few seconds or press Stop Recording when you're done.")
+
 
 st.set_page_config(page_title="AI Interview Coach", layout="centered", initial_sidebar_state="collapsed")
 
@@ -14,8 +221,9 @@ Welcome to your personal AI Interview Coach! Practice common interview questions
 """)
 
 # Check for API key at startup (moved here for more immediate feedback to user)
-# The ai_feedback.py will also check, but this provides a more prominent initial warning.
-if not (os.getenv("GEMINI_API_KEY") or st.secrets.get("GEMINI_API_KEY", None)):  # Added None default for st.secrets.get
+# ai_feedback.py only configures Gemini lazily on the first request, so this is the one startup check.
+# Offline backends (LLM_BACKEND=stub/http, used for load testing) don't need a key.
+if configured_backend_name() == "gemini" and not resolve_api_key():
     st.error("🚨 **API Key Missing!** To run this app, you need a `GEMINI_API_KEY`.")
     st.markdown("1. Get your key from [Google AI Studio](https://aistudio.google.com/).")
     st.markdown(
@@ -24,146 +232,153 @@ if not (os.getenv("GEMINI_API_KEY") or st.secrets.get("GEMINI_API_KEY", None)):
         "3. **For Streamlit Cloud deployment:** Go to your app's settings on Streamlit Cloud and add `GEMINI_API_KEY` as a secret.")
     st.stop()  # Stop the app execution here
 
-# Initialize session state variables
+# Initialize session state variables (restored from the session store first, if one is configured)
+restore_session()
+if 'scored_feedback' not in st.session_state:
+    st.session_state.scored_feedback = []  # Parsed feedback with scores, used to weight question selection
+if 'question_session' not in st.session_state:
+    start_question_session(*selected_filters())
 if 'current_question' not in st.session_state:
-    st.session_state.current_question = random.choice(sample_questions)
+    next_question()
 if 'feedback' not in st.session_state:
     st.session_state.feedback = ""
 if 'user_answer' not in st.session_state:
     st.session_state.user_answer = ""
+if 'text_input_area' not in st.session_state:
+    st.session_state.text_input_area = st.session_state.user_answer
+if 'feedback_timing' not in st.session_state:
+    st.session_state.feedback_timing = {}  # Time-to-first-token / total time of the last feedback
 if 'mode' not in st.session_state:
     st.session_state.mode = "text"  # Default to text input
+if 'stage' not in st.session_state:
+    st.session_state.stage = "answering"
+if 'voice_capture' not in st.session_state:
+    st.session_state.voice_capture = None  # VoiceCapture running in the background, if any
+
+# --- Question Filters (sidebar) ---
+bank = get_question_bank()
+with st.sidebar:
+    st.subheader("🎯 Question Filters")
+    st.selectbox("Category", ["All"] + bank.values("category"), key="category_filter", on_change=apply_question_filters)
+    st.selectbox("Difficulty", ["All"] + bank.values("difficulty"), key="difficulty_filter",
+                 on_change=apply_question_filters)
+    if not len(st.session_state.question_session):
+        st.warning("No questions match these filters; keeping the current question.")
 
 # --- Question Display ---
 st.subheader("💡 Current Interview Question:")
 st.info(st.session_state.current_question)
+if st.button("🔊 Read Question Aloud"):
+    speak_text(st.session_state.current_question)
 
 # --- Mode Selection (Text vs. Voice) ---
 st.markdown("---")  # Separator
 st.subheader("Choose Your Input Method:")
 col1, col2 = st.columns(2)
 with col1:
-    if st.button("🎤 Use Voice Input Mode", use_container_width=True, disabled=(st.session_state.mode == "voice")):
-        st.session_state.mode = "voice"
-        st.session_state.user_answer = ""  # Clear previous answer when switching mode
-        st.session_state.feedback = ""  # Clear feedback
-        st.rerun()
+    st.button("🎤 Use Voice Input Mode", use_container_width=True, disabled=(st.session_state.mode == "voice"),
+              on_click=switch_mode, args=("voice",))
 with col2:
-    if st.button("📝 Use Text Input Mode", use_container_width=True, disabled=(st.session_state.mode == "text")):
-        st.session_state.mode = "text"
-        st.session_state.user_answer = ""  # Clear previous answer when switching mode
-        st.session_state.feedback = ""  # Clear feedback
-        st.rerun()
+    st.button("📝 Use Text Input Mode", use_container_width=True, disabled=(st.session_state.mode == "text"),
+              on_click=switch_mode, args=("text",))
 
 st.markdown("---")  # Separator
 
 # --- User Input Area ---
-current_text_input = ""  # Placeholder for the current value in the text_area
-submitted_via_text = False  # Flag to indicate if text submit button was pressed
-
 if st.session_state.mode == "text":
     st.write("### Type your answer below:")
     current_text_input = st.text_area(
         "Your Answer:",
-        value=st.session_state.user_answer,  # Display what's in session_state (e.g., after a submit)
         height=250,
         placeholder="Type your detailed answer here... (e.g., using STAR method for behavioral questions)",
-        key="text_input_area"
+        key="text_input_area"  # Holds the answer across runs; submit_answer() copies it to user_answer
     )
-    # Check if the text submit button was pressed
-    submitted_via_text = st.button("🚀 Get Feedback (Text Input)", type="primary", use_container_width=True,
-                                   disabled=(not current_text_input.strip()))
+    st.button("🚀 Get Feedback (Text Input)", type="primary", use_container_width=True,
+              disabled=(not current_text_input.strip()), on_click=submit_answer)
 else:  # Voice Input Mode
     st.write("### Record your answer:")
     st.write("*(Ensure your microphone is connected and allowed by your browser/OS)*")
-    record_button = st.button("🎙️ Start Recording", type="primary", use_container_width=True)
-
-    # Placeholder for displaying transcribed text
-    transcribed_text_display = st.empty()
-
-    if record_button:
-        print("DEBUG (Terminal): 'Start Recording' button was clicked and its block is executing!")  # NEW DEBUG PRINT
-        # Clear previous recording info
-        st.session_state.user_answer = ""
-        st.session_state.feedback = ""
-        transcribed_text_display.empty()  # Clear previous transcribed text area
-
-        spoken_text = get_voice_input()  # This function will handle internal feedback via st.sidebar
+    capture = st.session_state.voice_capture
+    if capture is not None and capture.finished:
+        # Recording and recognition ran in the background; collect the result
+        st.session_state.voice_capture = None
+        spoken_text = report_voice_capture(capture)  # Shows success/errors in the sidebar
         if spoken_text:
             st.session_state.user_answer = spoken_text
-            transcribed_text_display.text_area("Your Transcribed Answer:", value=spoken_text, height=100, disabled=True)
-        # No else needed, get_voice_input handles its own errors/warnings in sidebar
 
-    # Determine if voice submit button should be enabled based on whether voice input was successfully transcribed
-    submitted_via_voice = st.button(
+    st.button("🎙️ Start Recording", type="primary", use_container_width=True,
+              disabled=st.session_state.voice_capture is not None, on_click=start_recording)
+    if st.session_state.voice_capture is not None:
+        st.button("⏹️ Stop Recording", use_container_width=True, on_click=stop_recording)
+        show_voice_capture_status()
+    elif st.session_state.user_answer:
+        st.text_area("Your Transcribed Answer:", value=st.session_state.user_answer, height=100, disabled=True)
+
+    # Enabled once voice input was successfully transcribed into st.session_state.user_answer
+    st.button(
         "🚀 Get Feedback (Voice Input)",
         type="primary",
         use_container_width=True,
-        disabled=(not st.session_state.user_answer.strip())
+        disabled=(not st.session_state.user_answer.strip()),
+        on_click=submit_answer
     )
-    # For voice mode, st.session_state.user_answer is already updated by get_voice_input
-    # The submission check below will use st.session_state.user_answer directly.
-
-# --- Handle submission based on mode ---
-# This block handles saving the input and triggering feedback.
-# It runs *before* the main feedback display.
-if st.session_state.mode == "text" and submitted_via_text:
-    st.session_state.user_answer = current_text_input  # Save the text input to session state
-    # This will trigger a rerun. On the next rerun, the condition below will be true.
-    st.rerun()  # Rerun to process the newly saved user_answer
-elif st.session_state.mode == "voice" and submitted_via_voice:
-    # For voice, st.session_state.user_answer is already set by get_voice_input
-    # We just need to rerun to process it.
-    st.rerun()
 
 # --- Feedback Generation and Display ---
-# This block now relies solely on st.session_state.user_answer being correctly set.
-# The 'submitted_via_text' and 'submitted_via_voice' are handled above with st.rerun().
-# So, this block essentially runs on the rerun *after* a submission.
-
-# Only attempt to generate feedback if st.session_state.user_answer is NOT empty
-# AND we don't already have feedback (to avoid re-generating on every rerun).
-if st.session_state.user_answer.strip() and not st.session_state.feedback:
-    print("DEBUG (Terminal): Entering feedback generation block because user_answer is set.")  # Confirmation print
-    print(f"DEBUG (Terminal): Processing answer: '{st.session_state.user_answer}'")
-    with st.spinner("Analyzing your answer with Gemini AI... This might take a few moments."):
-        feedback = get_gemini_feedback(st.session_state.user_answer, st.session_state.current_question)
-        st.session_state.feedback = feedback  # Store whatever feedback (or error message) is returned
-        st.markdown("---")
-        st.subheader("📊 Feedback from AI Coach:")
-
-        if st.session_state.feedback.strip():  # Check if feedback is not empty or just whitespace
-            st.markdown(st.session_state.feedback)  # Use markdown to render bullet points from LLM
-        else:
-            st.warning(
-                "No feedback content received from the AI. Please check the terminal for errors or try a different answer.")
-
-        # Optional: TTS for feedback
-        st.markdown("---")
-        if st.button("🔊 Read Feedback Aloud", use_container_width=True):
-            with st.spinner("Reading aloud..."):
-                speak_text(st.session_state.feedback)
-            st.success("Feedback read aloud!")
+# submit_answer() moved the flow to "grading", so the feedback is generated in this same run.
+if st.session_state.stage == "grading":
+    # Only the answer's size is logged; answers can contain personal details
+    log_event("feedback_requested", mode=st.session_state.mode, answer_chars=len(st.session_state.user_answer))
+    st.markdown("---")
+    st.subheader("📊 Feedback from AI Coach:")
+
+    # Render the feedback as it streams in instead of waiting for the whole response
+    feedback_placeholder = st.empty()
+    feedback_placeholder.info("Analyzing your answer with Gemini AI... This might take a few moments.")
+    timings = {}
+    feedback = ""
+    for chunk in stream_gemini_feedback(st.session_state.user_answer, st.session_state.current_question, timings):
+        feedback += chunk
+        feedback_placeholder.markdown(feedback + " ▌")
+    st.session_state.feedback = feedback  # Store whatever feedback (or error message) is returned
+    st.session_state.feedback_timing = timings
+    st.session_state.stage = "reviewing"
+    prefetch_speech(feedback)  # Synthesize in the background so "Read Feedback Aloud" starts instantly
+    scored = parse_feedback(feedback)
+    if any(criterion.score is not None for _, _, criterion in scored.criteria()):
+        st.session_state.scored_feedback.append(scored)
+
+    if st.session_state.feedback.strip():  # Check if feedback is not empty or just whitespace
+        feedback_placeholder.markdown(st.session_state.feedback)  # Use markdown to render bullet points from LLM
+        st.caption(format_feedback_timing(timings))
+    else:
+        feedback_placeholder.warning(
+            "No feedback content received from the AI. Please check the terminal for errors or try a different answer.")
+
+    # Optional: TTS for feedback
+    st.markdown("---")
+    render_read_aloud_controls()
 
 # Display feedback if it exists (even on subsequent reruns after generation)
-elif st.session_state.feedback.strip():
+elif st.session_state.stage == "reviewing" and st.session_state.feedback.strip():
     st.markdown("---")
     st.subheader("📊 Feedback from AI Coach:")
     st.markdown(st.session_state.feedback)
+    if st.session_state.feedback_timing:
+        st.caption(format_feedback_timing(st.session_state.feedback_timing))
     st.markdown("---")
-    if st.button("🔊 Read Feedback Aloud", use_container_width=True):
-        with st.spinner("Reading aloud..."):
-            speak_text(st.session_state.feedback)
-        st.success("Feedback read aloud!")
+    render_read_aloud_controls()
 
 # --- New Question Button ---
 st.markdown("---")
-if st.button("➡️ Next Question", use_container_width=True):
-    st.session_state.current_question = random.choice(sample_questions)
-    st.session_state.feedback = ""  # Clear previous feedback
-    st.session_state.user_answer = ""  # Clear previous answer
-    st.session_state.mode = "text"  # Reset mode for new question by default
-    st.rerun()
+st.button("➡️ Next Question", use_container_width=True, disabled=not len(st.session_state.question_session),
+          on_click=go_to_next_question)
 
 st.markdown("---")
-st.caption("Built with Streamlit and Google Gemini API.")
\ No newline at end of file
+st.caption("Built with Streamlit and Google Gemini API.")
+
+save_session()
+run_seconds = time.perf_counter() - run_started
+get_rerun_stats().end_run(run_action, run_seconds)
+observe("render", run_seconds)
+if os.getenv("SHOW_RERUN_STATS", "").lower() in ("1", "true", "yes"):
+    render_rerun_stats()
@@ -0,0 +1,268 @@
+# batch_grading.py
+"""
+Headless, concurrent grading of many (question, answer) pairs, e.g. a cohort's
+mock-interview transcripts. Uses the same evaluation prompt and feedback cache
+as the Streamlit app, but never touches Streamlit widgets.
+
+    python batch_grading.py -i answers.jsonl -o feedback.jsonl --concurrency 8 --rate 4
+
+Each input line is a JSON object with "question" and "answer" (and an optional "id").
+Each output line carries the feedback or the error for that item; lines are written
+as items finish, so use "index" to restore input order if needed.
+Pass --backend stub to grade against the local stub backend (no network, no API key).
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from ai_feedback import (STRUCTURED_PROMPT_VERSION, build_feedback_request, build_structured_feedback_prompt,
+                         get_backend, get_token_usage)
+from feedback_cache import get_feedback_cache, make_cache_key
+from feedback_results import FeedbackResult, parse_feedback, write_parquet
+from semantic_cache import get_semantic_cache
+from telemetry import span
+from llm_backends import create_backend
+
+# Exceptions worth retrying: rate limiting, overload and transient network problems.
+# Matched by class name so the google.api_core exceptions don't have to be imported up front.
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "TimeoutError", "ConnectionError", "TransientBackendError",
+}
+
+
+@dataclass
+class GradingResult:
+    index: int
+    id: Optional[str]
+    question: Optional[str]
+    feedback: Optional[str]
+    error: Optional[str]
+    attempts: int
+    latency_ms: float
+    cached: bool
+    result: Optional[FeedbackResult] = None  # Parsed scores/comments when grading with structured=True
+
+
+@dataclass
+class _InvalidLine:
+    error: str  # Why the input line could not be read as an item
+
+
+_END_OF_ITEMS = object()
+
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` requests per second on average, with bursts up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _is_retryable(exc):
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(exc).__mro__)
+
+
+async def _grade_one(index, item, backend, semaphore, bucket, cache, semantic, retries, base_delay, max_delay,
+                     structured):
+    start = time.perf_counter()
+    item_id = item.get("id") if isinstance(item, dict) else None
+    question = item.get("question") if isinstance(item, dict) else None
+    answer = item.get("answer") if isinstance(item, dict) else None
+
+    def result(feedback=None, error=None, attempts=0, cached=False):
+        parsed = None
+        if structured and feedback is not None:
+            parsed = parse_feedback(feedback)
+            if parsed.source == "empty":
+                return result(error="Model response could not be parsed as feedback", attempts=attempts)
+        return GradingResult(index, item_id, question, feedback, error, attempts,
+                             round((time.perf_counter() - start) * 1000, 1), cached, parsed)
+
+    if isinstance(item, _InvalidLine):
+        return result(error=item.error)
+    if not question or not answer or not str(answer).strip():
+        return result(error="Item needs non-empty 'question' and 'answer' fields")
+
+    if structured:
+        prompt, system_instruction = build_structured_feedback_prompt(answer, question), None
+        prompt_version = STRUCTURED_PROMPT_VERSION
+    else:
+        prompt, system_instruction, prompt_version = build_feedback_request(answer, question)
+    cache_key = make_cache_key(backend.model_name, prompt_version, question, answer)
+    if cache is not None:
+        cached_feedback = cache.get(cache_key)
+        if cached_feedback is not None:
+            return result(feedback=cached_feedback, cached=True)
+    if semantic is not None:
+        reused = semantic.lookup(backend.model_name, prompt_version, question, answer)
+        if reused is not None:
+            return result(feedback=reused[0], cached=True)
+
+    attempts = 0
+    async with semaphore:
+        while True:
+            attempts += 1
+            if bucket is not None:
+                await bucket.acquire()
+            try:
+                with span("llm_call"):
+                    text = await backend.generate_async(prompt, system_instruction, json_mode=structured)
+                if not text:
+                    return result(error="Model returned an empty response", attempts=attempts)
+                graded = result(feedback=text, attempts=attempts)
+                if cache is not None and graded.error is None:
+                    cache.set(cache_key, text)
+                if semantic is not None and graded.error is None:
+                    semantic.add(backend.model_name, prompt_version, question, answer, text)
+                return graded
+            except Exception as e:
+                if attempts > retries or not _is_retryable(e):
+                    return result(error=f"{type(e).__name__}: {e}", attempts=attempts)
+                # Exponential backoff with full jitter so parallel retries don't stampede the API together
+                await asyncio.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** (attempts - 1))))
+
+
+async def grade_stream(items, backend=None, concurrency=8, rate=None, retries=3, base_delay=0.5, max_delay=20.0,
+                       use_cache=True, structured=False):
+    """
+    Grades an iterable of {"question", "answer", "id"?} dicts concurrently and yields a
+    GradingResult per item as soon as it finishes. At most `concurrency` requests are in
+    flight and, if `rate` is set, at most `rate` requests start per second. Items are pulled
+    from `items` lazily, so arbitrarily large inputs are processed in bounded memory.
+    With structured=True the JSON prompt is used and each result carries a FeedbackResult.
+    """
+    backend = backend if backend is not None else get_backend()
+    cache = get_feedback_cache() if use_cache else None
+    semantic = get_semantic_cache() if use_cache else None  # Only if SEMANTIC_CACHE=1
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = TokenBucket(rate) if rate else None
+    pending = set()
+    max_pending = concurrency * 2  # Keep a small queue ready so the semaphore never starves
+    loop = asyncio.get_running_loop()
+    iterator = iter(items)
+    reading = None  # Future of the next item, read off the event loop
+    exhausted = False
+    index = 0
+
+    while not exhausted or pending:
+        if not exhausted and reading is None and len(pending) < max_pending:
+            # A blocking file or stdin read must not stall in-flight requests and backoff sleeps
+            reading = loop.run_in_executor(None, next, iterator, _END_OF_ITEMS)
+        waiting = pending | {reading} if reading is not None else pending
+        done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        if reading in done:
+            item, reading = reading.result(), None
+            if item is _END_OF_ITEMS:
+                exhausted = True
+            else:
+                pending.add(asyncio.ensure_future(
+                    _grade_one(index, item, backend, semaphore, bucket, cache, semantic, retries, base_delay,
+                               max_delay, structured)))
+                index += 1
+        for task in done & pending:
+            pending.discard(task)
+            yield task.result()
+
+
+async def grade_many(items, **kwargs):
+    """
+    Convenience wrapper around grade_stream() that returns all results in input order.
+    """
+    results = [result async for result in grade_stream(items, **kwargs)]
+    return sorted(results, key=lambda r: r.index)
+
+
+def _read_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            # Reported as a per-item error instead of aborting the whole batch
+            yield _InvalidLine(f"Invalid JSON on line {line_number}: {e}")
+
+
+async def _run_cli(args):
+    backend = create_backend(args.backend) if args.backend else None
+    source = open(args.input, encoding="utf-8") if args.input != "-" else sys.stdin
+    sink = open(args.output, "w", encoding="utf-8") if args.output != "-" else sys.stdout
+    total = errors = cached = 0
+    parsed_results, parsed_questions, parsed_ids = [], [], []  # Only collected for --parquet
+    start = time.perf_counter()
+    try:
+        async for result in grade_stream(_read_jsonl(source), backend=backend, concurrency=args.concurrency,
+                                         rate=args.rate, retries=args.retries, use_cache=not args.no_cache,
+                                         structured=args.structured or bool(args.parquet)):
+            sink.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+            if args.parquet and result.result is not None:
+                parsed_results.append(result.result)
+                parsed_questions.append(result.question)
+                parsed_ids.append(None if result.id is None else str(result.id))
+            total += 1
+            errors += result.error is not None
+            cached += result.cached
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    elapsed = time.perf_counter() - start
+    if args.parquet:
+        write_parquet(parsed_results, args.parquet, extra_columns={"id": parsed_ids, "question": parsed_questions})
+    print(f"Graded {total} items in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.1f} items/s), "
+          f"{errors} errors, {cached} served from cache", file=sys.stderr)
+    semantic = get_semantic_cache() if not args.no_cache else None
+    if semantic is not None:
+        stats = semantic.stats()
+        print(f"Near-duplicate reuse: {stats['reuses']}/{stats['lookups']} lookups ({stats['reuse_rate']:.1%})",
+              file=sys.stderr)
+    for model, usage in get_token_usage().items():
+        print(f"{model}: {usage['requests']} requests, {usage['input_tokens']} input / "
+              f"{usage['output_tokens']} output tokens, ~${usage['cost_usd']:.4f}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade interview answers from JSONL concurrently.")
+    parser.add_argument("-i", "--input", default="-", help="Input JSONL file (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Output JSONL file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max requests in flight")
+    parser.add_argument("--rate", type=float, default=None, help="Max requests started per second")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per item for transient errors")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the feedback cache")
+    parser.add_argument("--structured", action="store_true",
+                        help="Use the JSON prompt and include per-criterion scores in the output")
+    parser.add_argument("--parquet", default=None, help="Also write structured results to this Parquet file")
+    parser.add_argument("--backend", choices=["gemini", "stub", "http"], default=None,
+                        help="LLM backend (default: LLM_BACKEND, else gemini); stub options come from LLM_STUB_*")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run_cli(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# benchmarks/bench_load.py
+"""
+End-to-end load benchmark of the submit -> feedback flow against the stub backend, with
+stored baselines and a regression check:
+  * load     - --users concurrent simulated users, each submitting --rounds answers through
+               the same steps as app.py's grading block (stream feedback, parse scores, save
+               the session): requests/s, latency and time-to-first-token percentiles, errors
+  * app      - one session clicking through app.py in Streamlit's AppTest harness: time of
+               the script run that streams the feedback (AppTest keeps one global runtime,
+               so sessions cannot run concurrently in one process)
+  * memory   - Python heap allocated per AppTest session after one graded answer (tracemalloc;
+               includes the harness's copy of the rendered page, so an upper bound)
+  * startup  - cold import of ai_feedback in a fresh interpreter and the first app.py run
+
+Results are compared with the stored baseline (benchmarks/baselines/bench_load.json by
+default). Baselines are machine-specific, so they are not committed (the directory is
+git-ignored): record one with --save-baseline on the machine that runs the check. A
+baseline from another Python version or platform is refused instead of compared.
+
+Run from the repository root:
+    python benchmarks/bench_load.py                      # Report, compare if a baseline exists
+    python benchmarks/bench_load.py --save-baseline      # Record the current numbers
+    python benchmarks/bench_load.py --check --tolerance 0.25   # Exit 1 on a >25% regression
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "bench_load.json")
+QUESTION = "Describe a challenge you faced in a project and how you overcame it."
+
+# Metric -> True if higher is better
+METRICS = {
+    "throughput_rps": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "latency_p99_ms": False,
+    "ttft_p50_ms": False,
+    "app_submit_p50_ms": False,
+    "app_submit_p95_ms": False,
+    "memory_per_session_kb": False,
+    "cold_import_ms": False,
+    "first_run_ms": False,
+}
+# Settings that must match the baseline for the comparison to mean anything
+CONFIG_KEYS = ("users", "rounds", "latency", "tokens_per_second", "app_rounds", "sessions")
+# Numbers from a different interpreter or machine are not comparable at all
+MACHINE_KEYS = ("python", "platform")
+
+
+def answer_text(user, round_number):
+    return (f"User {user}, answer {round_number}: our release slipped two weeks, so I split the work "
+            f"into smaller milestones, paired with the newest engineer and we shipped on time.")
+
+
+def run_load(args):
+    """
+    Concurrent users in threads, sharing the process-wide backend, caches and session store
+    the way Streamlit sessions share one server process.
+    """
+    import ai_feedback
+    from feedback_results import parse_feedback
+    from session_store import MemorySessionStore
+    from telemetry import percentile
+
+    store = MemorySessionStore()
+    lock = threading.Lock()
+    latencies, ttfts = [], []
+    errors = 0
+
+    def user(user_id):
+        nonlocal errors
+        scored = []
+        for i in range(args.rounds):
+            start = time.perf_counter()
+            timings = {}
+            feedback = "".join(ai_feedback.stream_gemini_feedback(answer_text(user_id, i), QUESTION, timings))
+            result = parse_feedback(feedback)
+            if any(criterion.score is not None for _, _, criterion in result.criteria()):
+                scored.append(result)
+            store.save(f"load-{user_id}", {"feedback": feedback, "feedback_timing": timings,
+                                           "scored_feedback": [r.to_row() for r in scored]})
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if timings["ttft_s"] is not None:
+                    ttfts.append(timings["ttft_s"])
+                errors += feedback.startswith("An error occurred")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        list(pool.map(user, range(args.users)))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput_rps": len(latencies) / elapsed,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p95_ms": percentile(latencies, 95) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+        "ttft_p50_ms": percentile(ttfts, 50) * 1000 if ttfts else None,
+    }, errors
+
+
+def _new_session():
+    from streamlit.testing.v1 import AppTest
+
+    return AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+
+
+def _submit(at, text):
+    at.text_area[0].input(text).run()
+    start = time.perf_counter()
+    next(b for b in at.button if "Get Feedback" in b.label).click().run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"app.py raised: {at.exception[0].message}")
+    return elapsed
+
+
+def run_app(args):
+    """
+    Returns (first run seconds, submit run times) for one session driven through app.py.
+    """
+    at = _new_session()
+    start = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - start
+    submits = []
+    for i in range(args.app_rounds):
+        submits.append(_submit(at, answer_text("app", i)))
+        next(b for b in at.button if "Next Question" in b.label).click().run()
+    return first_run, submits
+
+
+def run_memory(args):
+    """
+    Heap growth per live session, each holding one graded answer.
+    """
+    _submit(_new_session().run(), answer_text("warmup", 0))  # Lazy imports and singletons are not per session
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = []
+    for i in range(args.sessions):
+        at = _new_session().run()
+        _submit(at, answer_text("memory", i))
+        sessions.append(at)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(sessions) / 1024
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints each metric next to its baseline and returns the names of regressed metrics,
+    or None if the baseline was recorded on a different machine.
+    """
+    other_machine = [key for key in MACHINE_KEYS if baseline.get(key) != results.get(key)]
+    if other_machine:
+        print(f"Baseline was recorded with a different {' and '.join(other_machine)} "
+              f"({', '.join(str(baseline.get(key)) for key in other_machine)}); not comparing. "
+              f"Record one on this machine with --save-baseline")
+        return None
+    mismatched = [key for key in CONFIG_KEYS if baseline["config"].get(key) != results["config"].get(key)]
+    if mismatched:
+        print(f"Warning: settings differ from the baseline ({', '.join(mismatched)}); the comparison is not like for like")
+    regressions = []
+    print(f"Against baseline from {baseline.get('recorded_at', '?')} (tolerance {tolerance:.0%}):")
+    for name, higher_is_better in METRICS.items():
+        current, previous = results["metrics"].get(name), baseline["metrics"].get(name)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"  {name}: {current:.1f} vs {previous:.1f} ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def run(args):
+    # Every request must reach the (deterministic) stub backend
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["FEEDBACK_CACHE_DISABLED"] = "1"
+    os.environ.pop("SEMANTIC_CACHE", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")  # One feedback log line per request would drown the report
+    from bench_startup import time_cold_import
+    import ai_feedback
+    from llm_backends import StubBackend
+    from telemetry import percentile
+
+    ai_feedback.set_backend(StubBackend(latency=args.latency, tokens_per_second=args.tokens_per_second, seed=0))
+
+    metrics, errors = run_load(args)
+    print(f"Load: {args.users} users x {args.rounds} answers: {metrics['throughput_rps']:.1f} req/s, "
+          f"latency p50 {metrics['latency_p50_ms']:.1f} ms, p95 {metrics['latency_p95_ms']:.1f} ms, "
+          f"p99 {metrics['latency_p99_ms']:.1f} ms, first token p50 {metrics['ttft_p50_ms']:.1f} ms, errors {errors}")
+
+    first_run, submits = run_app(args)
+    metrics.update(app_submit_p50_ms=percentile(submits, 50) * 1000, app_submit_p95_ms=percentile(submits, 95) * 1000,
+                   first_run_ms=first_run * 1000)
+    print(f"app.py: first run {metrics['first_run_ms']:.1f} ms, submit run p50 {metrics['app_submit_p50_ms']:.1f} ms, "
+          f"p95 {metrics['app_submit_p95_ms']:.1f} ms ({args.app_rounds} answers)")
+
+    metrics["memory_per_session_kb"] = run_memory(args)
+    print(f"Memory: {metrics['memory_per_session_kb']:.0f} KB per session ({args.sessions} sessions)")
+
+    imports = time_cold_import(args.import_runs)
+    metrics["cold_import_ms"] = percentile(imports, 50) * 1000
+    print(f"Cold import of ai_feedback: median {metrics['cold_import_ms']:.1f} ms ({args.import_runs} runs)")
+
+    results = {
+        "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: getattr(args, key) for key in CONFIG_KEYS},
+        "metrics": {name: round(value, 3) for name, value in metrics.items() if value is not None},
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with --save-baseline")
+        return 1 if args.check else 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions is None:
+        return 1 if args.check else 0
+    if errors:
+        regressions.append("errors")
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+    return 1 if args.check and regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark of submit -> feedback with a regression check.")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--rounds", type=int, default=10, help="Answers submitted per user")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--app-rounds", type=int, default=10, help="Answers submitted through app.py")
+    parser.add_argument("--sessions", type=int, default=10, help="Live app.py sessions for the memory measurement")
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a metric regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change before it counts as a regression")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
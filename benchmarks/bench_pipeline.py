@@ -0,0 +1,89 @@
+# benchmarks/bench_pipeline.py
+"""
+Offline throughput/latency benchmark of the feedback pipeline (prompt building, cache lookup,
+backend call) against the stub backend, either in-process or through the local HTTP stand-in.
+Subtracting the configured stub latency from the measured latency gives our own overhead.
+
+Run from the repository root:
+    python benchmarks/bench_pipeline.py --requests 200 --users 20 --latency 0.2
+    python benchmarks/bench_pipeline.py --backend http --stream
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(args):
+    os.environ["FEEDBACK_CACHE_DISABLED"] = "1"  # Every request must reach the backend
+    import ai_feedback
+    from llm_backends import HTTPBackend, StubBackend, make_stub_server
+    from telemetry import percentile
+
+    stub = StubBackend(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                       error_rate=args.error_rate, seed=args.seed)
+    server = None
+    if args.backend == "http":
+        server = make_stub_server("127.0.0.1", 0, stub)  # Port 0: pick any free port
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        ai_feedback.set_backend(HTTPBackend(f"http://127.0.0.1:{server.server_address[1]}"))
+    else:
+        ai_feedback.set_backend(stub)
+
+    def one_request(i):
+        answer = f"Benchmark answer number {i}: I led a team of four to ship the project on time."
+        question = "Describe a challenge you faced in a project and how you overcame it."
+        start = time.perf_counter()
+        if args.stream:
+            timings = {}
+            text = "".join(ai_feedback.stream_gemini_feedback(answer, question, timings))
+            ttft = timings["ttft_s"]
+        else:
+            text = ai_feedback.get_gemini_feedback(answer, question)
+            ttft = None
+        return time.perf_counter() - start, ttft, text.startswith("An error occurred")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        results = list(pool.map(one_request, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.shutdown()
+
+    latencies = [r[0] for r in results]
+    errors = sum(r[2] for r in results)
+    print(f"Backend: {args.backend}, mode: {'stream' if args.stream else 'blocking'}, "
+          f"{args.requests} requests from {args.users} concurrent users")
+    print(f"Throughput: {args.requests / elapsed:.1f} req/s, errors: {errors}")
+    print(f"Latency: p50 {percentile(latencies, 50) * 1000:.1f} ms, p95 {percentile(latencies, 95) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms")
+    if args.stream:
+        ttfts = [r[1] for r in results if r[1] is not None]
+        print(f"Time to first token: p50 {percentile(ttfts, 50) * 1000:.1f} ms, "
+              f"p95 {percentile(ttfts, 95) * 1000:.1f} ms")
+    expected = stub.latency + stub._chunk_delay() * len(stub._response_chunks("x"))
+    print(f"Pipeline overhead over the stub's own latency: "
+          f"{(statistics.median(latencies) - expected) * 1000:.1f} ms (median)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the feedback pipeline against an offline backend.")
+    parser.add_argument("--backend", choices=["stub", "http"], default="stub")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="Use the streaming path and report time to first token")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
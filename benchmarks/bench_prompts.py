@@ -0,0 +1,84 @@
+# benchmarks/bench_prompts.py
+"""
+Compares the "full" and "compact" feedback prompts on a fixed answer set: input/output tokens
+per call, estimated cost at Gemini prices and latency. Runs offline against the stub backend
+(which charges prompt-processing time per input token) or against Gemini with --backend gemini.
+
+Run from the repository root:
+    python benchmarks/bench_prompts.py
+    python benchmarks/bench_prompts.py --backend gemini   # needs GEMINI_API_KEY, costs real tokens
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ANSWERS = [
+    "I'm a backend developer with three years of Python experience, mostly building REST APIs.",
+    "In my last project our deployment kept failing, so I wrote a checklist and automated the tests; "
+    "releases went from weekly firefights to smooth Friday deploys.",
+    "I admire your focus on education and I want my work to help students learn faster.",
+    "My strength is persistence. My weakness is that I sometimes over-polish, so I now timebox reviews.",
+    "In five years I'd like to lead a small team and mentor junior engineers.",
+    "Under pressure I break the work into small steps and communicate early about risks.",
+    "I once missed a deadline because I underestimated testing; now I plan buffer time explicitly.",
+    "Yes - how does the team decide what to work on each sprint?",
+]
+
+
+def run_style(style, backend, questions):
+    import ai_feedback
+    from token_usage import estimate_cost
+
+    latencies, input_tokens, output_tokens = [], [], []
+    for question, answer in zip(questions, ANSWERS):
+        prompt, system_instruction, _ = ai_feedback.build_feedback_request(answer, question, style=style)
+        usage = {}
+        start = time.perf_counter()
+        backend.generate(prompt, system_instruction, usage=usage)
+        latencies.append(time.perf_counter() - start)
+        input_tokens.append(usage["input_tokens"])
+        output_tokens.append(usage["output_tokens"])
+    cost = estimate_cost(ai_feedback.MODEL_NAME, sum(input_tokens), sum(output_tokens))
+    return {
+        "latency_ms": statistics.median(latencies) * 1000,
+        "input_tokens": statistics.mean(input_tokens),
+        "output_tokens": statistics.mean(output_tokens),
+        "cost_per_1k_calls": cost / len(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare token usage and latency of the full and compact prompts.")
+    parser.add_argument("--backend", choices=["stub", "gemini"], default="stub")
+    parser.add_argument("--input-tokens-per-second", type=float, default=2000.0,
+                        help="Stub prompt-processing speed (stub backend only)")
+    args = parser.parse_args()
+
+    from llm_backends import StubBackend, create_backend
+    from questions import sample_questions
+
+    if args.backend == "stub":
+        backend = StubBackend(latency=0.05, tokens_per_second=0, input_tokens_per_second=args.input_tokens_per_second)
+    else:
+        import ai_feedback
+        backend = create_backend("gemini", model_name=ai_feedback.MODEL_NAME, api_key=ai_feedback.resolve_api_key())
+
+    questions = sample_questions[:len(ANSWERS)]
+    results = {style: run_style(style, backend, questions) for style in ("full", "compact")}
+    print(f"Backend: {args.backend}, {len(questions)} answers per style"
+          + (" (token counts are estimates)" if args.backend == "stub" else ""))
+    print(f"{'style':<8} {'latency p50':>12} {'input tok':>10} {'output tok':>11} {'$ / 1k calls':>13}")
+    for style, r in results.items():
+        print(f"{style:<8} {r['latency_ms']:>9.1f} ms {r['input_tokens']:>10.0f} {r['output_tokens']:>11.0f} "
+              f"{r['cost_per_1k_calls']:>13.4f}")
+    saved = 1 - results["compact"]["input_tokens"] / results["full"]["input_tokens"]
+    print(f"Compact prompt sends {saved:.0%} fewer input tokens per call.")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
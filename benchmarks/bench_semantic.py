@@ -0,0 +1,91 @@
+# benchmarks/bench_semantic.py
+"""
+Benchmark of the near-duplicate answer index (semantic_cache.py): fills one question's
+index with --answers synthetic answers, then measures lookup latency (embedding + exact
+cosine search) and the reuse rate on a mix of reworded copies and unrelated answers.
+
+Run from the repository root:
+    python benchmarks/bench_semantic.py --answers 100000
+    python benchmarks/bench_semantic.py --answers 10000 --threshold 0.85
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTION = "Tell me about yourself."
+# Pseudo-words drawn with a Zipf-like skew, so answers share common words like real ones do
+# without being copies of one template
+VOCABULARY = ["".join(random.Random(i).choice("etaoinshrdlucmfwyp") for _ in range(2 + i % 8)) for i in range(5000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def synthetic_answer(rng):
+    return " ".join(rng.choices(VOCABULARY, weights=WEIGHTS, k=rng.randint(40, 80)))
+
+
+def reword(answer, rng):
+    """
+    A near-duplicate: same answer with a greeting added and one word changed.
+    """
+    words = answer.split()
+    words[rng.randrange(len(words))] = rng.choice(["really", "also", "mostly", "very"])
+    return "Hi, " + " ".join(words)
+
+
+def run(args):
+    from semantic_cache import SemanticFeedbackCache, create_embedder
+    from telemetry import percentile
+
+    rng = random.Random(args.seed)
+    cache = SemanticFeedbackCache(embedder=create_embedder(args.embedder), threshold=args.threshold)
+    answers = [synthetic_answer(rng) for _ in range(args.answers)]
+    start = time.perf_counter()
+    for i, answer in enumerate(answers):
+        cache.add("stub", "v1", QUESTION, answer, f"feedback {i}")
+    elapsed = time.perf_counter() - start
+    index = cache._indexes[("stub", "v1", QUESTION)]
+    print(f"Indexed {args.answers} answers in {elapsed:.1f}s ({args.answers / elapsed:.0f}/s), "
+          f"{index._vectors.nbytes / 1e6:.1f} MB of vectors ({cache.embedder.name})")
+
+    queries = [reword(rng.choice(answers), rng) if rng.random() < args.duplicate_share else synthetic_answer(rng)
+               for _ in range(args.lookups)]
+    embed_times, search_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        vector = cache.embedder.embed(query)
+        embedded = time.perf_counter()
+        index.nearest(vector)
+        embed_times.append(embedded - start)
+        search_times.append(time.perf_counter() - embedded)
+    total = [e + s for e, s in zip(embed_times, search_times)]
+    print(f"Lookup latency over {args.lookups} queries: p50 {percentile(total, 50) * 1000:.2f} ms, "
+          f"p95 {percentile(total, 95) * 1000:.2f} ms, p99 {percentile(total, 99) * 1000:.2f} ms "
+          f"(embedding p50 {percentile(embed_times, 50) * 1000:.2f} ms, "
+          f"search p50 {percentile(search_times, 50) * 1000:.2f} ms)")
+
+    for query in queries:
+        cache.lookup("stub", "v1", QUESTION, query)
+    stats = cache.stats()
+    print(f"Reuse at threshold {args.threshold}: {stats['reuse_rate']:.1%} of lookups "
+          f"({args.duplicate_share:.0%} were reworded copies), mean similarity of reused answers "
+          f"{stats['mean_similarity'] or 0:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate answer lookup.")
+    parser.add_argument("--answers", type=int, default=100_000, help="Answers stored for one question")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--duplicate-share", type=float, default=0.3, help="Share of lookups that are reworded copies")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--embedder", default="hashing",
+                        help="hashing, hashing:<dimensions> or sentence-transformers:<model>")
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_startup.py
+"""
+Measures what a user pays before first paint:
+  * cold start  - importing ai_feedback in a fresh interpreter
+  * per rerun   - re-executing app.py the way Streamlit does on every interaction
+  * per action  - script runs (and their time) caused by each button, from rerun_stats
+
+Run from the repository root:
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import ai_feedback; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def time_cold_import(runs):
+    """
+    Imports ai_feedback in a new interpreter each run so nothing is already in sys.modules.
+    """
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", COLD_IMPORT_SNIPPET],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def time_reruns(runs):
+    """
+    Executes app.py through Streamlit's AppTest harness; the first run includes imports,
+    the following ones are the steady-state cost of a rerun.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-dummy-key")  # app.py stops early without a key
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+    return first, timings
+
+
+def count_action_runs(rounds):
+    """
+    Clicks through submit -> next question -> voice mode -> text mode against the stub
+    backend and returns the rerun_stats snapshot (script runs per action).
+    """
+    from streamlit.testing.v1 import AppTest
+    from rerun_stats import get_rerun_stats
+
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY"] = "0"
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60).run()
+
+    def click(label):
+        next(b for b in at.button if label in b.label).click().run()
+
+    get_rerun_stats().reset()
+    for i in range(rounds):
+        at.text_area[0].input(f"Benchmark answer {i}: I led a team of four to ship on time.").run()
+        click("Get Feedback")
+        click("Next Question")
+        click("Use Voice Input Mode")
+        click("Use Text Input Mode")
+    return get_rerun_stats().snapshot()
+
+
+def _summary(timings):
+    return f"median {statistics.median(timings) * 1000:.1f} ms, min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ai_feedback import time and app.py rerun overhead.")
+    parser.add_argument("--runs", type=int, default=10, help="Repetitions per measurement")
+    args = parser.parse_args()
+
+    print(f"Cold import of ai_feedback ({args.runs} runs): {_summary(time_cold_import(args.runs))}")
+    first, reruns = time_reruns(args.runs)
+    print(f"First app.py run (includes imports): {first * 1000:.1f} ms")
+    print(f"app.py rerun ({args.runs} runs): {_summary(reruns)}")
+    print("Script runs per action:")
+    for name, stats in sorted(count_action_runs(args.runs).items()):
+        if stats["actions"]:
+            print(f"  {name}: {stats['runs_per_action']:.1f} runs/action, {stats['mean_run_ms']:.1f} ms/run")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_voice.py
+"""
+Offline latency benchmark of the voice capture pipeline (voice_capture.py): a WAV file is
+fed through the same chunked recording path as the microphone, and a stub recognizer that
+sleeps for --recognition-latency stands in for Google Speech Recognition.
+
+For each number of recognition workers, reports the wall-clock time per answer (long answers
+are cut into segments at pauses and transcribed concurrently), how long the calling
+(Streamlit) thread is blocked when a recording starts, the calibration cost of the first vs
+later recordings, and the time from the detected end of the answer to the transcript.
+Without --wav a synthetic two-minute answer (ambient noise, sentences of tone bursts
+separated by pauses, trailing silence) is generated.
+
+Run from the repository root:
+    python benchmarks/bench_voice.py --workers 1,2,4,8
+    python benchmarks/bench_voice.py --wav answer1.wav answer2.wav --realtime --workers 4
+"""
+import argparse
+import array
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 16000
+
+
+def write_synthetic_answer(path, speech_seconds=3.0, sentence_seconds=6.0, lead_seconds=1.2, tail_seconds=1.5, seed=0):
+    """
+    Writes a 16 kHz mono WAV: quiet noise, then "speech", then quiet noise again. Speech is
+    220 Hz tone bursts separated by 0.2 s gaps (shorter than the pause threshold), grouped
+    into sentences of sentence_seconds separated by 1 s pauses where segments get cut.
+    """
+    rng = random.Random(seed)
+    samples = array.array("h")
+
+    def noise(seconds):
+        samples.extend(rng.randint(-60, 60) for _ in range(int(seconds * SAMPLE_RATE)))
+
+    noise(lead_seconds)
+    spoken = in_sentence = 0.0
+    while spoken < speech_seconds:
+        burst = min(0.6, speech_seconds - spoken)
+        samples.extend(int(4000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE) + rng.randint(-60, 60))
+                       for i in range(int(burst * SAMPLE_RATE)))
+        spoken += burst
+        in_sentence += burst
+        if spoken < speech_seconds:
+            gap = 1.0 if in_sentence >= sentence_seconds else 0.2
+            in_sentence = 0.0 if gap == 1.0 else in_sentence
+            noise(gap)
+            spoken += gap
+    noise(tail_seconds)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+
+
+def run(args):
+    from telemetry import percentile
+    from voice_capture import CapturePipeline, WavFrameSource
+
+    def stub_recognize(audio):
+        time.sleep(args.recognition_latency)
+        return f"stub transcript of {len(audio.frame_data)} bytes"
+
+    paths = args.wav
+    if not paths:
+        paths = [os.path.join(tempfile.mkdtemp(), "answer.wav")]
+        write_synthetic_answer(paths[0], speech_seconds=args.speech_seconds)
+
+    print(f"{args.recordings} recordings of each of {len(paths)} file(s) "
+          f"({'real time' if args.realtime else 'as fast as possible'}), "
+          f"stub recognition latency {args.recognition_latency * 1000:.0f} ms")
+    baseline = None
+    for workers in args.workers:
+        pipeline = CapturePipeline(recognize_fn=stub_recognize, recognition_workers=workers)
+        blocked, calibration, end_to_text, wall, segments = [], [], [], [], 0
+        for i in range(args.recordings):
+            for path in paths:
+                start = time.perf_counter()
+                capture = pipeline.start(WavFrameSource(path, realtime=args.realtime), timeout=None, end_silence=None)
+                blocked.append(time.perf_counter() - start)
+                capture.wait()
+                wall.append(time.perf_counter() - start)
+                if capture.error_kind:
+                    print(f"{path}: {capture.error_kind}: {capture.error}")
+                    continue
+                calibration.append(capture.timings["calibration_s"])
+                end_to_text.append(capture.timings["end_to_text_s"])
+                segments = capture.timings["segments"]
+        if not calibration:
+            continue
+        median_wall = percentile(wall, 50)
+        baseline = baseline or median_wall
+        print(f"\n{workers} recognition worker(s), {segments} segments per answer:")
+        print(f"  Wall clock per answer: p50 {median_wall * 1000:.1f} ms "
+              f"({baseline / median_wall:.1f}x vs {args.workers[0]} worker(s))")
+        print(f"  Caller thread blocked per recording: max {max(blocked) * 1000:.2f} ms")
+        print(f"  Calibration: first recording {calibration[0] * 1000:.1f} ms, "
+              f"later recordings max {max(calibration[1:] or [0.0]) * 1000:.1f} ms (threshold reused)")
+        print(f"  End of answer -> transcript: p50 {percentile(end_to_text, 50) * 1000:.1f} ms, "
+              f"p95 {percentile(end_to_text, 95) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the voice capture pipeline on a WAV file.")
+    parser.add_argument("--wav", nargs="*", help="Mono WAV files to use instead of a synthetic answer")
+    parser.add_argument("--recordings", type=int, default=3)
+    parser.add_argument("--speech-seconds", type=float, default=120.0, help="Length of the synthetic answer")
+    parser.add_argument("--workers", type=lambda v: [int(w) for w in v.split(",")], default=[1, 2, 4, 8],
+                        help="Comma-separated recognition worker counts to compare")
+    parser.add_argument("--recognition-latency", type=float, default=0.3, help="Stub recognizer latency in seconds")
+    parser.add_argument("--realtime", action="store_true", help="Pace the file like a live microphone")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
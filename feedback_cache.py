@@ -0,0 +1,207 @@
+# feedback_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Where the on-disk tier lives. Override with FEEDBACK_CACHE_PATH, or set
+# FEEDBACK_CACHE_DISABLED=1 to always go straight to the model.
+DEFAULT_CACHE_PATH = os.path.join(".cache", "feedback_cache.sqlite3")
+DEFAULT_MEMORY_ITEMS = 256  # Hot entries kept in the in-process LRU tier
+DEFAULT_DISK_ITEMS = 20000  # Entries kept in SQLite before the least recently used are evicted
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60  # Graded feedback is reused for up to a week
+ACCESS_FLUSH_BATCH = 64  # Memory-tier hits whose last_access is written to disk in one go
+
+
+def normalize_answer(answer):
+    """
+    Normalizes an answer so trivial differences (case, extra spaces, line breaks)
+    map to the same cache entry.
+    """
+    return " ".join((answer or "").split()).casefold()
+
+
+def make_cache_key(model_name, prompt_version, question, answer):
+    """
+    Builds a content-addressed key from everything that influences the feedback text.
+    Changing the model or the prompt template version automatically invalidates old entries.
+    """
+    parts = [model_name, prompt_version, " ".join((question or "").split()), normalize_answer(answer)]
+    # \x1f (unit separator) can't appear in normal typing, so fields can't bleed into each other
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class FeedbackCache:
+    """
+    Two-tier cache for generated feedback: an in-memory LRU in front of a SQLite file
+    that survives restarts. Both tiers honour the same TTL; the disk tier is trimmed
+    to max_disk_items by last access time, which memory-tier hits update in batches.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_memory_items=DEFAULT_MEMORY_ITEMS,
+                 max_disk_items=DEFAULT_DISK_ITEMS, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (value, created_at)
+        self._lock = threading.Lock()  # Streamlit serves sessions from several threads
+        self._conn = None
+        self._pending_access = {}  # key -> last memory-tier hit not yet written to disk
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.stores = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS feedback_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_cache_access ON feedback_cache(last_access)")
+            self._conn.commit()
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key, value, created_at):
+        # Insert into (or refresh) the memory tier and drop the least recently used entries
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    def _flush_access(self):
+        # Hot entries are served from memory; without this their disk rows would look
+        # least recently used and be the first ones trimmed
+        if self._pending_access and self._conn is not None:
+            self._conn.executemany("UPDATE feedback_cache SET last_access = ? WHERE key = ?",
+                                   [(at, key) for key, at in self._pending_access.items()])
+            self._conn.commit()
+        self._pending_access.clear()
+
+    def get(self, key):
+        """
+        Returns the cached feedback for key, or None on a miss (or an expired entry).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    if self._conn is not None:
+                        self._pending_access[key] = now
+                        if len(self._pending_access) >= ACCESS_FLUSH_BATCH:
+                            self._flush_access()
+                    return entry[0]
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM feedback_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if not self._expired(created_at, now):
+                        self._conn.execute("UPDATE feedback_cache SET last_access = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        self._remember(key, value, created_at)  # Promote to the hot tier
+                        self.hits_disk += 1
+                        return value
+                    self._conn.execute("DELETE FROM feedback_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """
+        Stores feedback in both tiers, evicting old entries if the disk tier is full.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self.stores += 1
+            if self._conn is None:
+                return
+            self._pending_access.pop(key, None)
+            self._flush_access()  # So the trim below sees current access times
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feedback_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.ttl_seconds is not None:
+                self._conn.execute("DELETE FROM feedback_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM feedback_cache").fetchone()
+            overflow = count - self.max_disk_items
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM feedback_cache WHERE key IN "
+                    "(SELECT key FROM feedback_cache ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.disk_evictions += overflow
+            self._conn.commit()
+
+    def clear(self):
+        """
+        Removes every entry from both tiers (counters are kept).
+        """
+        with self._lock:
+            self._memory.clear()
+            self._pending_access.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM feedback_cache")
+                self._conn.commit()
+
+    def stats(self):
+        """
+        Returns hit/miss counters and tier sizes, e.g. for a debug panel or log line.
+        """
+        with self._lock:
+            disk_items = 0
+            if self._conn is not None:
+                (disk_items,) = self._conn.execute("SELECT COUNT(*) FROM feedback_cache").fetchone()
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+                "memory_items": len(self._memory),
+                "disk_items": disk_items,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_feedback_cache():
+    """
+    Returns the process-wide cache, creating it on first use.
+    Returns None when caching is disabled via FEEDBACK_CACHE_DISABLED.
+    """
+    global _cache
+    if os.getenv("FEEDBACK_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FeedbackCache(path=os.getenv("FEEDBACK_CACHE_PATH", DEFAULT_CACHE_PATH))
+    return _cache
@@ -0,0 +1,204 @@
+# feedback_results.py
+"""
+Structured feedback results: one score (1-5) and comment per criterion plus the
+improvement suggestion, parsed from the model's JSON output. Lists of results can be
+turned into NumPy columns or written to Parquet for reporting over many graded answers.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# (field name, label used in the prompt and in the rendered markdown)
+CRITERIA = (
+    ("communication_clarity", "Communication Clarity"),
+    ("answer_structure", "Answer Structure"),
+    ("professional_tone", "Professional Tone"),
+    ("completeness_relevance", "Completeness/Relevance"),
+    ("technical_coverage", "Technical Coverage"),
+)
+CRITERION_NAMES = tuple(name for name, _ in CRITERIA)
+MIN_SCORE, MAX_SCORE = 1, 5
+
+# Matches "- **Communication Clarity:** comment" lines of the free-form markdown feedback,
+# optionally with a score such as "(4/5)" or "4/5 -" at the start of the comment
+_MARKDOWN_LINE = re.compile(
+    r"^\s*[-*]\s*\*\*(?P<label>[^*:]+?)(?:\s*\(optional\))?:\*\*\s*"
+    r"(?:\(?(?P<score>[1-5])\s*/\s*5\)?\s*[-:–]?\s*)?(?P<comment>.*)$",
+    re.MULTILINE,
+)
+_SUGGESTION = re.compile(r"\*\*Suggestion for Improvement:?\*\*:?\s*(?:[-*]\s*)?(?P<text>.+)", re.DOTALL)
+_LABEL_TO_NAME = {label.lower(): name for name, label in CRITERIA}
+
+
+@dataclass
+class CriterionFeedback:
+    __slots__ = ("score", "comment")
+    score: Optional[int]  # None when not applicable (e.g. technical coverage of an HR question) or unknown
+    comment: str
+
+
+@dataclass
+class FeedbackResult:
+    __slots__ = CRITERION_NAMES + ("suggestion", "source")
+    communication_clarity: CriterionFeedback
+    answer_structure: CriterionFeedback
+    professional_tone: CriterionFeedback
+    completeness_relevance: CriterionFeedback
+    technical_coverage: CriterionFeedback
+    suggestion: str
+    source: str  # "json", "markdown" (fallback parse) or "empty"
+
+    def criteria(self):
+        """
+        Yields (field name, label, CriterionFeedback) in rubric order.
+        """
+        for name, label in CRITERIA:
+            yield name, label, getattr(self, name)
+
+    def to_markdown(self):
+        """
+        Renders the result in the same bullet format as the free-form feedback.
+        """
+        lines = []
+        for _, label, criterion in self.criteria():
+            score = f" ({criterion.score}/5)" if criterion.score is not None else ""
+            lines.append(f"- **{label}:**{score} {criterion.comment}")
+        lines += ["", "**Suggestion for Improvement:**", f"- {self.suggestion}"]
+        return "\n".join(lines)
+
+    def to_row(self):
+        """
+        Flat dict (one column per score/comment), e.g. for JSONL output.
+        """
+        row = {}
+        for name, _, criterion in self.criteria():
+            row[f"{name}_score"] = criterion.score
+            row[f"{name}_comment"] = criterion.comment
+        row["suggestion"] = self.suggestion
+        row["source"] = self.source
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Inverse of to_row(), e.g. to restore results saved in a session store.
+        """
+        criteria = {
+            name: CriterionFeedback(_coerce_score(row.get(f"{name}_score")), str(row.get(f"{name}_comment") or ""))
+            for name in CRITERION_NAMES
+        }
+        return cls(suggestion=str(row.get("suggestion") or ""), source=str(row.get("source") or "json"), **criteria)
+
+
+def _empty_criterion():
+    return CriterionFeedback(None, "")
+
+
+def _coerce_score(value):
+    # Accept 4, 4.0 or "4"; anything out of range or non-numeric (e.g. "N/A") becomes None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value.isdigit():
+            return None
+    try:
+        score = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return score if MIN_SCORE <= score <= MAX_SCORE else None
+
+
+def _from_json(data):
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    criteria = {}
+    for name in CRITERION_NAMES:
+        entry = data.get(name)
+        if isinstance(entry, dict):
+            criteria[name] = CriterionFeedback(_coerce_score(entry.get("score")), str(entry.get("comment") or ""))
+        elif entry is None:
+            criteria[name] = _empty_criterion()
+        else:
+            # Tolerate {"communication_clarity": "comment only"}
+            criteria[name] = CriterionFeedback(None, str(entry))
+    if not any(c.comment or c.score is not None for c in criteria.values()):
+        raise ValueError("No criteria found in JSON")
+    return FeedbackResult(suggestion=str(data.get("suggestion") or ""), source="json", **criteria)
+
+
+def _from_markdown(text):
+    criteria = {name: _empty_criterion() for name in CRITERION_NAMES}
+    for match in _MARKDOWN_LINE.finditer(text):
+        name = _LABEL_TO_NAME.get(match.group("label").strip().lower())
+        if name is not None:
+            score = match.group("score")
+            criteria[name] = CriterionFeedback(int(score) if score else None, match.group("comment").strip())
+    suggestion_match = _SUGGESTION.search(text)
+    suggestion = suggestion_match.group("text").strip() if suggestion_match else ""
+    found = suggestion or any(c.comment for c in criteria.values())
+    return FeedbackResult(suggestion=suggestion, source="markdown" if found else "empty", **criteria)
+
+
+def parse_feedback(text):
+    """
+    Parses model output into a FeedbackResult. JSON (optionally wrapped in a ```json fence)
+    is the fast path; if it isn't valid JSON in the expected shape, the free-form markdown
+    format is parsed instead. Never raises; an unparseable text gives source="empty".
+    """
+    text = (text or "").strip()
+    candidate = text
+    if candidate.startswith("```"):
+        candidate = candidate.strip("`")
+        candidate = (candidate[4:] if candidate.lower().startswith("json") else candidate).strip()
+    if candidate.startswith("{"):
+        try:
+            return _from_json(json.loads(candidate))
+        except ValueError:  # json.JSONDecodeError is a ValueError too
+            pass
+    return _from_markdown(text)
+
+
+def results_to_columns(results):
+    """
+    Converts FeedbackResults into a dict of NumPy arrays: one float32 score column per
+    criterion (NaN where there is no score) plus object columns for the text fields.
+    Aggregations then become vectorized, e.g. np.nanmean(columns["answer_structure_score"]).
+    """
+    import numpy as np
+
+    results = list(results)
+    columns = {}
+    for name in CRITERION_NAMES:
+        scores = np.fromiter(
+            (np.nan if getattr(r, name).score is None else getattr(r, name).score for r in results),
+            dtype=np.float32, count=len(results),
+        )
+        columns[f"{name}_score"] = scores
+        columns[f"{name}_comment"] = np.array([getattr(r, name).comment for r in results], dtype=object)
+    columns["suggestion"] = np.array([r.suggestion for r in results], dtype=object)
+    columns["source"] = np.array([r.source for r in results], dtype=object)
+    return columns
+
+
+def write_parquet(results, path, extra_columns=None):
+    """
+    Writes FeedbackResults to a Parquet file (requires the optional pyarrow package).
+    extra_columns can add aligned columns such as question or id.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Writing Parquet requires pyarrow: pip install pyarrow") from e
+
+    columns = results_to_columns(results)
+    arrays = {}
+    for key, values in columns.items():
+        # Object columns hold strings; score columns keep NaN as null
+        arrays[key] = pa.array(values.tolist(), type=pa.string()) if values.dtype == object \
+            else pa.array(values, from_pandas=True)
+    for key, values in (extra_columns or {}).items():
+        arrays[key] = pa.array(list(values))
+    pq.write_table(pa.table(arrays), path)
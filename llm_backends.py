@@ -0,0 +1,463 @@
+# llm_backends.py
+"""
+Interchangeable text-generation backends for the feedback pipeline.
+
+  * gemini - Google Gemini via google-generativeai (the default)
+  * stub   - in-process deterministic stand-in with configurable latency, throughput and error rate
+  * http   - client for any server speaking the tiny JSON protocol below, e.g. the local stub server:
+                 python llm_backends.py serve --port 8765 --latency 0.5
+
+The backend is picked with the LLM_BACKEND environment variable (see create_backend()),
+so the whole app can be load-tested offline:
+    LLM_BACKEND=stub LLM_STUB_LATENCY=0.8 streamlit run app.py
+"""
+import argparse
+import asyncio
+import codecs
+import functools
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from token_usage import estimate_tokens, get_usage_tracker
+
+DEFAULT_GEMINI_MODEL = 'models/gemini-1.5-flash'
+
+
+class BlockedContentError(Exception):
+    """The prompt or the response was blocked by the provider's content policy."""
+
+
+class TransientBackendError(Exception):
+    """A failure worth retrying (rate limiting, overload, simulated errors)."""
+
+
+class LLMBackend:
+    """
+    Minimal interface every backend implements. Only generate() is required;
+    stream() and generate_async() fall back to it.
+
+    All calls take an optional system_instruction (sent separately from the per-call prompt)
+    and an optional `usage` dict that is filled with the call's token counts and estimated cost.
+    Every call is also added to the process-wide token_usage tracker.
+    """
+    name = "base"
+    model_name = None
+
+    def generate(self, prompt, system_instruction=None, json_mode=False, usage=None):
+        """
+        Returns the full response text for prompt. With json_mode=True the backend is asked
+        to return a JSON document only (Gemini's JSON output mode).
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt, system_instruction=None, usage=None):
+        """Yields the response text in chunks."""
+        yield self.generate(prompt, system_instruction, usage=usage)
+
+    async def generate_async(self, prompt, system_instruction=None, json_mode=False, usage=None):
+        """Async generate(); by default runs the blocking call in the default thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self.generate, prompt, system_instruction, json_mode, usage))
+
+    def health_check(self):
+        """Returns a dict describing whether the backend is usable."""
+        return {"backend": self.name, "model": self.model_name, "ok": True, "error": None}
+
+    def _record_usage(self, usage, input_tokens, output_tokens, estimated=False):
+        record = get_usage_tracker().record(self.model_name, input_tokens, output_tokens, estimated)
+        if usage is not None:
+            usage.update(record)
+
+    def _record_estimated_usage(self, usage, prompt, system_instruction, text):
+        input_tokens = estimate_tokens(prompt) + estimate_tokens(system_instruction)
+        self._record_usage(usage, input_tokens, estimate_tokens(text), estimated=True)
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini. The SDK is imported and configured on first use, not on construction,
+    so building the backend costs nothing on a Streamlit rerun.
+    """
+    name = "gemini"
+
+    def __init__(self, model_name=DEFAULT_GEMINI_MODEL, api_key=None):
+        self.model_name = model_name
+        self._api_key = api_key
+        self._genai = None
+        self._models = {}  # system_instruction -> GenerativeModel (the instruction is fixed per model object)
+        self._lock = threading.Lock()
+
+    def _get_model(self, system_instruction=None):
+        model = self._models.get(system_instruction)
+        if model is None:
+            with self._lock:
+                if self._genai is None:
+                    api_key = self._api_key or os.getenv("GEMINI_API_KEY")
+                    if not api_key:
+                        raise RuntimeError("GEMINI_API_KEY not found in Streamlit secrets or environment variables")
+                    import google.generativeai as genai  # Deferred: importing the SDK alone takes ~1s
+                    genai.configure(api_key=api_key)
+                    self._genai = genai
+                model = self._models.get(system_instruction)
+                if model is None:
+                    model = self._genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+                    self._models[system_instruction] = model
+        return model
+
+    def _translate(self, e):
+        # Map SDK exceptions onto the backend-neutral ones; anything else is re-raised as-is
+        if self._genai is not None and isinstance(e, self._genai.types.BlockedPromptException):
+            return BlockedContentError(str(e))
+        return e
+
+    @staticmethod
+    def _generation_config(json_mode):
+        return {"response_mime_type": "application/json"} if json_mode else None
+
+    def _record_response_usage(self, usage, response, prompt, system_instruction, text):
+        # Gemini reports exact counts in usage_metadata; fall back to an estimate if it's missing
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is not None and getattr(metadata, "prompt_token_count", None):
+            self._record_usage(usage, metadata.prompt_token_count, metadata.candidates_token_count or 0)
+        else:
+            self._record_estimated_usage(usage, prompt, system_instruction, text)
+
+    def generate(self, prompt, system_instruction=None, json_mode=False, usage=None):
+        model = self._get_model(system_instruction)
+        try:
+            response = model.generate_content(prompt, generation_config=self._generation_config(json_mode))
+            text = response.text
+        except Exception as e:
+            raise self._translate(e) from e
+        self._record_response_usage(usage, response, prompt, system_instruction, text)
+        return text
+
+    def stream(self, prompt, system_instruction=None, usage=None):
+        model = self._get_model(system_instruction)
+        parts = []
+        try:
+            response = model.generate_content(prompt, stream=True)
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. only a finish reason) raise on .text
+                    continue
+                if text:
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            raise self._translate(e) from e
+        # Usage metadata is complete once the stream has been fully consumed
+        self._record_response_usage(usage, response, prompt, system_instruction, "".join(parts))
+
+    async def generate_async(self, prompt, system_instruction=None, json_mode=False, usage=None):
+        model = self._get_model(system_instruction)
+        try:
+            response = await model.generate_content_async(prompt, generation_config=self._generation_config(json_mode))
+            text = response.text
+        except Exception as e:
+            raise self._translate(e) from e
+        self._record_response_usage(usage, response, prompt, system_instruction, text)
+        return text
+
+    def health_check(self):
+        """
+        Lists models over the network, so call it on demand, never on every rerun.
+        """
+        from importlib import metadata
+
+        report = super().health_check()
+        report.update(ok=False, sdk_version=None, models=[])
+        try:
+            report["sdk_version"] = metadata.version("google-generativeai")
+        except metadata.PackageNotFoundError:
+            pass
+        try:
+            self._get_model()
+            for m in self._genai.list_models():
+                if "generateContent" in m.supported_generation_methods:
+                    report["models"].append(m.name)
+                    if m.name == self.model_name:
+                        report["ok"] = True
+        except Exception as e:
+            report["error"] = str(e)
+        return report
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic in-process stand-in for load testing. Each call waits `latency` seconds
+    before the first token, then emits the response at `tokens_per_second` (about 4 characters
+    per token), and fails with TransientBackendError at `error_rate`. If `input_tokens_per_second`
+    is set, reading the prompt adds input_tokens / input_tokens_per_second seconds, so longer
+    prompts are slower like on a real model. The response text only depends on the prompt,
+    so repeated runs produce identical output.
+    """
+    name = "stub"
+
+    def __init__(self, latency=0.2, tokens_per_second=200.0, error_rate=0.0, seed=None, model_name="stub",
+                 input_tokens_per_second=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.input_tokens_per_second = input_tokens_per_second
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()  # random.Random isn't safe to share between threads
+
+    def _should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def _response_chunks(self, prompt, json_mode=False):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        # Scores derived from the prompt hash: stable per prompt, varied across prompts
+        scores = [int(c, 16) % 5 + 1 for c in digest[:4]]
+        if json_mode:
+            text = json.dumps({
+                "communication_clarity": {"score": scores[0], "comment": "The answer was clear and easy to follow."},
+                "answer_structure": {"score": scores[1], "comment": "The answer had a clear beginning, middle and end."},
+                "professional_tone": {"score": scores[2], "comment": "The tone was confident and professional."},
+                "completeness_relevance": {"score": scores[3], "comment": "The answer addressed the question."},
+                "technical_coverage": {"score": None, "comment": "Not applicable."},
+                "suggestion": f"Add one concrete, measurable result to close the answer. (stub {digest})",
+            })
+            return [text[i:i + 16] for i in range(0, len(text), 16)]
+        text = (
+            f"- **Communication Clarity:** ({scores[0]}/5) The answer was clear and easy to follow.\n"
+            f"- **Answer Structure:** ({scores[1]}/5) The answer had a clear beginning, middle and end.\n"
+            f"- **Professional Tone:** ({scores[2]}/5) The tone was confident and professional.\n"
+            f"- **Completeness/Relevance:** ({scores[3]}/5) The answer addressed the question directly.\n"
+            "- **Technical Coverage:** Not applicable.\n\n"
+            "**Suggestion for Improvement:**\n"
+            f"- Add one concrete, measurable result to close the answer. (stub {digest})"
+        )
+        return [text[i:i + 16] for i in range(0, len(text), 16)]  # ~4 tokens per chunk
+
+    def _chunk_delay(self):
+        return 4.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _first_token_delay(self, prompt, system_instruction):
+        if not self.input_tokens_per_second:
+            return self.latency
+        input_tokens = estimate_tokens(prompt) + estimate_tokens(system_instruction)
+        return self.latency + input_tokens / self.input_tokens_per_second
+
+    def generate(self, prompt, system_instruction=None, json_mode=False, usage=None):
+        chunks = self._response_chunks(prompt, json_mode)
+        time.sleep(self._first_token_delay(prompt, system_instruction) + self._chunk_delay() * len(chunks))
+        if self._should_fail():
+            raise TransientBackendError("simulated transient backend failure")
+        text = "".join(chunks)
+        self._record_estimated_usage(usage, prompt, system_instruction, text)
+        return text
+
+    def stream(self, prompt, system_instruction=None, usage=None):
+        time.sleep(self._first_token_delay(prompt, system_instruction))
+        if self._should_fail():
+            raise TransientBackendError("simulated transient backend failure")
+        delay = self._chunk_delay()
+        chunks = self._response_chunks(prompt)
+        for chunk in chunks:
+            if delay:
+                time.sleep(delay)
+            yield chunk
+        self._record_estimated_usage(usage, prompt, system_instruction, "".join(chunks))
+
+    async def generate_async(self, prompt, system_instruction=None, json_mode=False, usage=None):
+        chunks = self._response_chunks(prompt, json_mode)
+        await asyncio.sleep(self._first_token_delay(prompt, system_instruction) + self._chunk_delay() * len(chunks))
+        if self._should_fail():
+            raise TransientBackendError("simulated transient backend failure")
+        text = "".join(chunks)
+        self._record_estimated_usage(usage, prompt, system_instruction, text)
+        return text
+
+
+class HTTPBackend(LLMBackend):
+    """
+    Client for a local HTTP stand-in. Protocol:
+      POST {url}/generate  {"prompt", "system_instruction", "json_mode"} -> {"text": ...}
+      POST {url}/stream    {"prompt", "system_instruction"} -> response text streamed in chunks
+    Status 429/503 raise TransientBackendError, 451 raises BlockedContentError.
+    Token usage is estimated from the text on the client side.
+    """
+    name = "http"
+
+    def __init__(self, url="http://127.0.0.1:8765", timeout=120, model_name="http"):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.model_name = model_name
+
+    def _post(self, path, payload):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code in (429, 503):
+                raise TransientBackendError(f"HTTP {e.code} from {self.url}") from e
+            if e.code == 451:
+                raise BlockedContentError(f"HTTP {e.code} from {self.url}") from e
+            raise
+
+    def generate(self, prompt, system_instruction=None, json_mode=False, usage=None):
+        payload = {"prompt": prompt, "system_instruction": system_instruction, "json_mode": json_mode}
+        with self._post("/generate", payload) as response:
+            text = json.loads(response.read().decode("utf-8"))["text"]
+        self._record_estimated_usage(usage, prompt, system_instruction, text)
+        return text
+
+    def stream(self, prompt, system_instruction=None, usage=None):
+        parts = []
+        # A multi-byte character can be split across two reads; the decoder holds its first bytes back
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with self._post("/stream", {"prompt": prompt, "system_instruction": system_instruction}) as response:
+            while True:
+                chunk = response.read1(4096) if hasattr(response, "read1") else response.read(4096)
+                text = decoder.decode(chunk, final=not chunk)
+                if text:
+                    parts.append(text)
+                    yield text
+                if not chunk:
+                    break
+        self._record_estimated_usage(usage, prompt, system_instruction, "".join(parts))
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def configured_backend_name():
+    """
+    Name of the backend selected by LLM_BACKEND (defaults to "gemini").
+    """
+    return os.getenv("LLM_BACKEND", "gemini").strip().lower()
+
+
+def create_backend(name=None, **options):
+    """
+    Builds a backend by name (default: LLM_BACKEND). Options not passed explicitly are read from
+    LLM_STUB_LATENCY, LLM_STUB_TOKENS_PER_SECOND, LLM_STUB_INPUT_TOKENS_PER_SECOND, LLM_STUB_ERROR_RATE, LLM_STUB_SEED,
+    LLM_HTTP_URL and GEMINI_MODEL.
+    """
+    name = (name or configured_backend_name()).lower()
+    if name == "gemini":
+        return GeminiBackend(model_name=options.get("model_name", os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL)),
+                             api_key=options.get("api_key"))
+    if name == "stub":
+        seed = options.get("seed", os.getenv("LLM_STUB_SEED"))
+        return StubBackend(
+            latency=options.get("latency", _env_float("LLM_STUB_LATENCY", 0.2)),
+            tokens_per_second=options.get("tokens_per_second", _env_float("LLM_STUB_TOKENS_PER_SECOND", 200.0)),
+            input_tokens_per_second=options.get("input_tokens_per_second",
+                                                _env_float("LLM_STUB_INPUT_TOKENS_PER_SECOND", None)),
+            error_rate=options.get("error_rate", _env_float("LLM_STUB_ERROR_RATE", 0.0)),
+            seed=int(seed) if seed not in (None, "") else None,
+        )
+    if name == "http":
+        return HTTPBackend(url=options.get("url", os.getenv("LLM_HTTP_URL", "http://127.0.0.1:8765")))
+    raise ValueError(f"Unknown LLM backend '{name}'. Expected one of: gemini, stub, http")
+
+
+def make_stub_server(host="127.0.0.1", port=8765, backend=None):
+    """
+    Returns a ThreadingHTTPServer that serves `backend` (a StubBackend by default) over the
+    HTTPBackend protocol. Call serve_forever() on it, e.g. from a daemon thread in a benchmark.
+    """
+    backend = backend or StubBackend()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass  # Keep benchmark output readable
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length).decode("utf-8"))
+            prompt = payload.get("prompt", "")
+            system_instruction = payload.get("system_instruction")
+            try:
+                if self.path == "/generate":
+                    text = backend.generate(prompt, system_instruction, json_mode=bool(payload.get("json_mode")))
+                    body = json.dumps({"text": text}).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif self.path == "/stream":
+                    chunks = backend.stream(prompt, system_instruction)
+                    first = next(chunks, "")  # Surface errors before the 200 status is sent
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; charset=utf-8")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for chunk in _chain(first, chunks):
+                        data = chunk.encode("utf-8")
+                        if data:
+                            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                            self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    self.send_error(404)
+            except TransientBackendError:
+                self.send_error(503)
+            except BlockedContentError:
+                self.send_error(451)
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128  # The default backlog of 5 drops connections under load tests
+
+    return Server((host, port), Handler)
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP stand-in for the LLM backend.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="Serve a StubBackend over HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    serve.add_argument("--tokens-per-second", type=float, default=200.0)
+    serve.add_argument("--input-tokens-per-second", type=float, default=None,
+                       help="Prompt processing speed; longer prompts add latency when set")
+    serve.add_argument("--error-rate", type=float, default=0.0)
+    serve.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    backend = StubBackend(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                          input_tokens_per_second=args.input_tokens_per_second,
+                          error_rate=args.error_rate, seed=args.seed)
+    server = make_stub_server(args.host, args.port, backend)
+    print(f"Serving stub LLM backend on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+# question_bank.py
+"""
+Question bank: loads interview questions from a JSONL or SQLite file, indexes them by
+category, role, difficulty, tag and the feedback criteria they exercise, and hands out
+questions per session without repeats.
+
+JSONL lines look like:
+    {"id": "hr-001", "text": "Tell me about yourself.", "category": "behavioral", "role": "any",
+     "difficulty": "easy", "tags": ["introduction"], "criteria": ["communication_clarity", "answer_structure"]}
+
+For banks with thousands of questions, convert to SQLite once; then only the ids matching
+a filter are read up front and question texts are fetched by primary key when asked for:
+    python question_bank.py build-sqlite data/questions.jsonl data/questions.sqlite3
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Tuple
+
+from feedback_results import CRITERION_NAMES, MAX_SCORE
+
+DEFAULT_QUESTION_BANK_PATH = os.path.join("data", "questions.jsonl")
+FILTER_FIELDS = ("category", "role", "difficulty", "tag", "criterion")
+
+
+@dataclass(frozen=True)
+class Question:
+    id: str
+    text: str
+    category: str = "general"
+    role: str = "any"
+    difficulty: str = "medium"
+    tags: Tuple[str, ...] = ()
+    criteria: Tuple[str, ...] = ()  # Feedback criteria this question is good practice for
+
+    @classmethod
+    def from_dict(cls, data, default_id=None):
+        return cls(
+            id=str(data.get("id", default_id)),
+            text=data["text"],
+            category=data.get("category") or "general",
+            role=data.get("role") or "any",
+            difficulty=data.get("difficulty") or "medium",
+            tags=tuple(data.get("tags") or ()),
+            criteria=tuple(c for c in data.get("criteria") or () if c in CRITERION_NAMES),
+        )
+
+
+class InMemoryQuestionBank:
+    """
+    Bank held in memory with a dict index per filter field (value -> list of question ids).
+    """
+
+    def __init__(self, questions=()):
+        self._questions = {}
+        self._indexes = {field: {} for field in FILTER_FIELDS}
+        for question in questions:
+            self.add(question)
+
+    @classmethod
+    def from_texts(cls, texts):
+        """
+        Builds a bank from plain question strings (e.g. questions.sample_questions).
+        """
+        return cls(Question(id=f"q{i}", text=text) for i, text in enumerate(texts))
+
+    def add(self, question):
+        self._questions[question.id] = question
+        keys = {
+            "category": (question.category,), "role": (question.role,), "difficulty": (question.difficulty,),
+            "tag": question.tags, "criterion": question.criteria,
+        }
+        for field, values in keys.items():
+            for value in values:
+                self._indexes[field].setdefault(value, []).append(question.id)
+
+    def __len__(self):
+        return len(self._questions)
+
+    def get(self, question_id):
+        return self._questions[question_id]
+
+    def values(self, field):
+        """
+        Sorted distinct values of a filter field, e.g. values("category") for a dropdown.
+        """
+        return sorted(self._indexes[field])
+
+    def ids(self, category=None, role=None, difficulty=None, tag=None, criterion=None):
+        """
+        Ids of the questions matching every given filter, via the smallest matching index first.
+        """
+        filters = {"category": category, "role": role, "difficulty": difficulty, "tag": tag, "criterion": criterion}
+        candidates = [self._indexes[field].get(value, []) for field, value in filters.items() if value]
+        if not candidates:
+            return list(self._questions)
+        candidates.sort(key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            other = set(other)
+            result = [qid for qid in result if qid in other]
+        return list(result)
+
+
+class JSONLQuestionBank(InMemoryQuestionBank):
+    """
+    In-memory bank loaded from a JSONL file on first use rather than on construction.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            with open(self.path, encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if line:
+                        self.add(Question.from_dict(json.loads(line), default_id=f"line-{line_number}"))
+            self._loaded = True
+
+    def __len__(self):
+        self._ensure_loaded()
+        return super().__len__()
+
+    def get(self, question_id):
+        self._ensure_loaded()
+        return super().get(question_id)
+
+    def values(self, field):
+        self._ensure_loaded()
+        return super().values(field)
+
+    def ids(self, **filters):
+        self._ensure_loaded()
+        return super().ids(**filters)
+
+
+class SQLiteQuestionBank:
+    """
+    Bank backed by a SQLite file (see build_sqlite_bank). Filters run as indexed queries that
+    only return ids; question texts are read one at a time by primary key.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def get(self, question_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, text, category, role, difficulty, tags, criteria FROM questions WHERE id = ?",
+                (question_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(question_id)
+        return Question(row[0], row[1], row[2], row[3], row[4], tuple(json.loads(row[5])), tuple(json.loads(row[6])))
+
+    def values(self, field):
+        if field in ("tag", "criterion"):
+            query = "SELECT DISTINCT value FROM question_labels WHERE kind = ? ORDER BY value"
+            params = (field,)
+        else:
+            query = f"SELECT DISTINCT {field} FROM questions ORDER BY {field}"  # field is one of FILTER_FIELDS
+            params = ()
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def ids(self, category=None, role=None, difficulty=None, tag=None, criterion=None):
+        clauses, params = [], []
+        for field, value in (("category", category), ("role", role), ("difficulty", difficulty)):
+            if value:
+                clauses.append(f"{field} = ?")
+                params.append(value)
+        for kind, value in (("tag", tag), ("criterion", criterion)):
+            if value:
+                clauses.append("id IN (SELECT question_id FROM question_labels WHERE kind = ? AND value = ?)")
+                params += [kind, value]
+        query = "SELECT id FROM questions" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+
+def build_sqlite_bank(jsonl_path, sqlite_path):
+    """
+    Converts a JSONL question file into an indexed SQLite bank. Returns the number of questions.
+    """
+    source = JSONLQuestionBank(jsonl_path)
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        conn.executescript("""
+            DROP TABLE IF EXISTS questions;
+            DROP TABLE IF EXISTS question_labels;
+            CREATE TABLE questions (id TEXT PRIMARY KEY, text TEXT NOT NULL, category TEXT, role TEXT,
+                                    difficulty TEXT, tags TEXT, criteria TEXT);
+            CREATE TABLE question_labels (question_id TEXT, kind TEXT, value TEXT);
+        """)
+        for question_id in source.ids():
+            q = source.get(question_id)
+            conn.execute("INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (q.id, q.text, q.category, q.role, q.difficulty, json.dumps(q.tags), json.dumps(q.criteria)))
+            conn.executemany("INSERT INTO question_labels VALUES (?, ?, ?)",
+                             [(q.id, "tag", t) for t in q.tags] + [(q.id, "criterion", c) for c in q.criteria])
+        conn.executescript("""
+            CREATE INDEX idx_questions_category ON questions(category);
+            CREATE INDEX idx_questions_role ON questions(role);
+            CREATE INDEX idx_questions_difficulty ON questions(difficulty);
+            CREATE INDEX idx_question_labels ON question_labels(kind, value);
+        """)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(source)
+
+
+def load_question_bank(path=None, fallback_texts=()):
+    """
+    Opens the bank at path (default: QUESTION_BANK_PATH, else data/questions.jsonl) by extension.
+    Falls back to an in-memory bank of fallback_texts if the file doesn't exist.
+    """
+    path = path or os.getenv("QUESTION_BANK_PATH", DEFAULT_QUESTION_BANK_PATH)
+    if not os.path.exists(path):
+        return InMemoryQuestionBank.from_texts(fallback_texts)
+    if path.endswith((".sqlite", ".sqlite3", ".db")):
+        return SQLiteQuestionBank(path)
+    return JSONLQuestionBank(path)
+
+
+def weakness_weights(results):
+    """
+    Turns past FeedbackResults into per-criterion weights for QuestionSession.next():
+    the lower the average score on a criterion, the higher its weight. Criteria without
+    scores are left out, so with no scored feedback the selection stays uniform.
+    """
+    totals = {}
+    for result in results:
+        for name, _, criterion in result.criteria():
+            if criterion.score is not None:
+                total = totals.setdefault(name, [0, 0])
+                total[0] += criterion.score
+                total[1] += 1
+    # Average 5/5 -> weight 1, average 1/5 -> weight 5
+    return {name: MAX_SCORE + 1 - total / count for name, (total, count) in totals.items()}
+
+
+class QuestionSession:
+    """
+    Per-user iterator over a (filtered) bank: questions come from a shuffled permutation,
+    so nothing repeats until every matching question has been asked, and next() is O(1).
+    With weights ({criterion: weight}), a criterion is drawn by weight first and the question
+    comes from that criterion's own shuffled queue, steering practice toward weak areas.
+    Weights are ignored when the session is filtered to a single criterion.
+    """
+
+    def __init__(self, bank, seed=None, **filters):
+        self.bank = bank
+        self.filters = {k: v for k, v in filters.items() if v}
+        self._random = random.Random(seed)
+        self._ids = bank.ids(**self.filters)
+        self._order = self._shuffled(self._ids)
+        self._position = 0
+        self._asked = set()  # Ids asked in the current pass
+        self._criterion_queues = {}  # criterion -> [shuffled ids, position], built on first weighted draw
+        self.last_id = None
+
+    def _shuffled(self, ids):
+        ids = list(ids)
+        self._random.shuffle(ids)
+        return ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _start_new_pass(self):
+        self._order = self._shuffled(self._ids)
+        if len(self._order) > 1 and self._order[0] == self.last_id:
+            # Don't ask the same question twice in a row across passes
+            self._order[0], self._order[-1] = self._order[-1], self._order[0]
+        self._position = 0
+        self._asked.clear()
+        self._criterion_queues.clear()
+
+    def _next_unasked(self):
+        # Skip ids already handed out through a weighted draw; amortized O(1)
+        while self._position < len(self._order) and self._order[self._position] in self._asked:
+            self._position += 1
+        if self._position >= len(self._order):
+            self._start_new_pass()
+        question_id = self._order[self._position]
+        self._position += 1
+        return question_id
+
+    def _next_for_criterion(self, criterion):
+        queue = self._criterion_queues.get(criterion)
+        if queue is None:
+            matching = self.bank.ids(criterion=criterion, **self.filters)
+            queue = self._criterion_queues[criterion] = [self._shuffled(matching), 0]
+        ids, position = queue
+        while position < len(ids) and ids[position] in self._asked:
+            position += 1
+        queue[1] = position + 1
+        return ids[position] if position < len(ids) else None
+
+    def next(self, weights=None):
+        """
+        Returns the next Question. Raises LookupError if no question matches the filters.
+        """
+        if not self._ids:
+            raise LookupError(f"No questions match {self.filters or 'the bank'}")
+        question_id = None
+        # A session already filtered to one criterion has nothing left to steer
+        if weights and "criterion" not in self.filters:
+            criteria = [c for c, w in weights.items() if w > 0]
+            if criteria:
+                criterion = self._random.choices(criteria, weights=[weights[c] for c in criteria])[0]
+                question_id = self._next_for_criterion(criterion)
+        if question_id is None:
+            question_id = self._next_unasked()
+        self._asked.add(question_id)
+        self.last_id = question_id
+        return self.bank.get(question_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Question bank tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build-sqlite", help="Convert a JSONL bank to an indexed SQLite bank")
+    build.add_argument("jsonl_path")
+    build.add_argument("sqlite_path")
+    args = parser.parse_args(argv)
+    count = build_sqlite_bank(args.jsonl_path, args.sqlite_path)
+    print(f"Wrote {count} questions to {args.sqlite_path}")
+
+
+if __name__ == "__main__":
+    main()
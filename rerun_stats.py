@@ -0,0 +1,65 @@
+# rerun_stats.py
+"""
+Counts and times full script runs of app.py per user action (submit, next question, ...),
+so the number of reruns each action costs can be checked. Callbacks call action(); each
+script run calls start_run()/end_run(), and runs are attributed to the last action.
+Set SHOW_RERUN_STATS=1 to see the table in the app's sidebar.
+"""
+import threading
+
+
+class RerunStats:
+    """
+    Thread-safe per-action counters: actions taken, script runs they caused, run time.
+    """
+
+    def __init__(self):
+        self._totals = {}  # action -> [actions, runs, completed runs, total seconds]
+        self._lock = threading.Lock()
+
+    def _entry(self, name):
+        return self._totals.setdefault(name, [0, 0, 0, 0.0])
+
+    def action(self, name):
+        with self._lock:
+            self._entry(name)[0] += 1
+
+    def start_run(self, name):
+        with self._lock:
+            self._entry(name)[1] += 1
+
+    def end_run(self, name, seconds):
+        # Runs cut short by st.rerun()/st.stop() are counted by start_run but never get here
+        with self._lock:
+            entry = self._entry(name)
+            entry[2] += 1
+            entry[3] += seconds
+
+    def snapshot(self):
+        """
+        Returns {action: {"actions", "runs", "runs_per_action", "mean_run_ms"}}.
+        """
+        with self._lock:
+            return {
+                name: {
+                    "actions": t[0],
+                    "runs": t[1],
+                    "runs_per_action": t[1] / t[0] if t[0] else None,
+                    "mean_run_ms": t[3] / t[2] * 1000 if t[2] else None,
+                }
+                for name, t in self._totals.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+
+_stats = RerunStats()
+
+
+def get_rerun_stats():
+    """
+    Returns the process-wide counters shared by all sessions.
+    """
+    return _stats
@@ -0,0 +1,149 @@
+# session_store.py
+"""
+Optional server-side store for the practice session (current question, answer, feedback
+history), keyed by a session id kept in the page URL. With a store enabled, a browser
+refresh restores the session, and with the SQLite store several app processes can serve
+the same user.
+
+Select with SESSION_STORE:
+    none   - default; state lives only in st.session_state, as before
+    memory - in-process dict, least recently used sessions evicted beyond SESSION_STORE_MAX_SESSIONS
+    sqlite - local SQLite file at SESSION_STORE_PATH (default .cache/sessions.sqlite3)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_SESSION_STORE_PATH = os.path.join(".cache", "sessions.sqlite3")
+DEFAULT_MAX_SESSIONS = 1000  # Memory store: sessions kept before the least recently used are evicted
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60  # Sessions untouched for a month are dropped
+
+
+class MemorySessionStore:
+    """
+    Sessions held in this process as JSON strings (so stored state can't be mutated by
+    reference), in an LRU bounded by max_sessions.
+    """
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()  # session_id -> (json data, updated_at)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def load(self, session_id):
+        """
+        Returns the saved state dict, or None if the session is unknown or expired.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if self.ttl_seconds is not None and time.time() - entry[1] > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return json.loads(entry[0])
+
+    def save(self, session_id, data):
+        payload = json.dumps(data)
+        with self._lock:
+            self._sessions[session_id] = (payload, time.time())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a local SQLite file (WAL mode), shared by every app process on the machine.
+    """
+
+    def __init__(self, path=DEFAULT_SESSION_STORE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        """
+        Returns the saved state dict, or None if the session is unknown or expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None or (self.ttl_seconds is not None and time.time() - row[1] > self.ttl_seconds):
+            return None
+        return json.loads(row[0])
+
+    def save(self, session_id, data):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                               (session_id, json.dumps(data), now))
+            if self.ttl_seconds is not None:
+                self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+            self._conn.commit()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(name=None):
+    """
+    Builds the store named by SESSION_STORE (or `name`); returns None for "none".
+    """
+    name = (name or os.getenv("SESSION_STORE", "none")).lower()
+    if name == "none":
+        return None
+    if name == "memory":
+        return MemorySessionStore(max_sessions=int(os.getenv("SESSION_STORE_MAX_SESSIONS", DEFAULT_MAX_SESSIONS)))
+    if name == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_STORE_PATH", DEFAULT_SESSION_STORE_PATH))
+    raise ValueError(f"Unknown SESSION_STORE {name!r}; expected none, memory or sqlite")
+
+
+_store = None
+_store_created = False
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    Returns the process-wide store, creating it on first use (None when disabled).
+    """
+    global _store, _store_created
+    if not _store_created:
+        with _store_lock:
+            if not _store_created:
+                _store = create_session_store()
+                _store_created = True
+    return _store
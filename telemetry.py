@@ -0,0 +1,296 @@
+# telemetry.py
+"""
+Lightweight tracing, metrics and structured logging for the practice loop.
+
+    with span("llm_call"):            # Times a stage; an exception also counts an error
+        ...
+    observe("voice_capture", 2.4)     # Records a duration measured elsewhere
+    increment("blocked_prompts_total")
+    log_event("feedback_streamed", chunks=12, ttft_s=0.41)
+
+Stages used by the app: voice_capture, speech_recognition, prompt_build, llm_call,
+llm_first_token, render, tts, tts_synthesis. Per stage the last RESERVOIR_SIZE durations are kept,
+so p50/p95/p99 reflect recent traffic.
+
+Metrics are off unless METRICS_ENABLED=1 (span() then returns a shared no-op object and
+observe()/increment() return immediately). When enabled they can be exported as
+Prometheus text, together with the LLM token usage totals from token_usage.py:
+    METRICS_PORT=9464  -> served at http://localhost:9464/metrics (METRICS_HOST to bind elsewhere)
+    METRICS_FILE=path  -> rewritten every METRICS_FILE_INTERVAL seconds (default 15)
+
+log_event() writes one JSON object per line to stderr through the "interview_coach"
+logger (LOG_LEVEL, default INFO; LOG_FORMAT=text for plain messages).
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from token_usage import get_usage_tracker
+
+METRIC_PREFIX = "interview_coach"
+RESERVOIR_SIZE = 2048  # Recent durations kept per stage for percentiles
+QUANTILES = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger("interview_coach")
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(), "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+def _configure_logging():
+    # Leave the logger alone if the embedding application already configured it
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        handler.setFormatter(_JSONFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+_configure_logging()
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """
+    Logs a structured event: {"ts", "level", "event", **fields} as one JSON line.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+def _nearest_rank(ordered, q):
+    # Nearest-rank percentile of an already sorted list, q from 0 to 1. Rounded before ceil()
+    # so float noise (0.07 * 100 == 7.000000000000001) doesn't push it up a rank
+    index = math.ceil(round(q * len(ordered), 9)) - 1
+    return ordered[max(0, min(len(ordered) - 1, index))]
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile (pct from 0 to 100) of a list of numbers: the smallest value
+    with at least pct% of the values at or below it. Also used by the benchmarks.
+    """
+    return _nearest_rank(sorted(values), pct / 100)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe stage timings (count, sum and a reservoir of recent values) and labelled counters.
+    """
+
+    def __init__(self, reservoir_size=RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self._timings = {}  # stage -> [count, total seconds, deque of recent seconds]
+        self._counters = {}  # (name, sorted label items) -> value
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            timing = self._timings.get(stage)
+            if timing is None:
+                timing = self._timings[stage] = [0, 0.0, deque(maxlen=self.reservoir_size)]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2].append(seconds)
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """
+        Returns {"stages": {stage: {"count", "sum_s", "p50_s", "p95_s", "p99_s"}},
+                 "counters": {name: [(labels dict, value), ...]}}.
+        """
+        with self._lock:
+            timings = {stage: (t[0], t[1], sorted(t[2])) for stage, t in self._timings.items()}
+            counters = dict(self._counters)
+        stages = {}
+        for stage, (count, total, recent) in timings.items():
+            stages[stage] = {"count": count, "sum_s": total}
+            for q in QUANTILES:
+                stages[stage][f"p{int(q * 100)}_s"] = _nearest_rank(recent, q) if recent else None
+        grouped = {}
+        for (name, labels), value in sorted(counters.items()):
+            grouped.setdefault(name, []).append((dict(labels), value))
+        return {"stages": stages, "counters": grouped}
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def render_prometheus(self):
+        """
+        Prometheus text exposition format: one summary for stage durations plus the counters.
+        """
+        snapshot = self.snapshot()
+        name = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [f"# HELP {name} Duration of each stage of the practice loop.", f"# TYPE {name} summary"]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            for q in QUANTILES:
+                value = stats[f"p{int(q * 100)}_s"]
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {"NaN" if value is None else repr(value)}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats["sum_s"]!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+        for counter, series in snapshot["counters"].items():
+            full_name = f"{METRIC_PREFIX}_{counter}"
+            lines.append(f"# TYPE {full_name} counter")
+            for labels, value in series:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _registry.observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            _registry.increment("errors_total", stage=self.stage, error=exc_type.__name__)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+_registry = MetricsRegistry()
+_enabled = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+
+
+def metrics_enabled():
+    return _enabled
+
+
+def set_metrics_enabled(enabled):
+    """
+    Turns collection on or off at runtime (e.g. in benchmarks); existing data is kept.
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def get_metrics_registry():
+    return _registry
+
+
+def span(stage):
+    """
+    Context manager timing `stage`; an exception inside it is also counted in errors_total.
+    """
+    return _Span(stage) if _enabled else _NOOP_SPAN
+
+
+def observe(stage, seconds):
+    if _enabled:
+        _registry.observe(stage, seconds)
+
+
+def increment(name, value=1, **labels):
+    if _enabled:
+        _registry.increment(name, value, **labels)
+
+
+def render_metrics():
+    """
+    Everything exported: stage timings and counters, plus the LLM token usage totals.
+    """
+    return _registry.render_prometheus() + get_usage_tracker().render_prometheus()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+
+def write_metrics_file(path):
+    """
+    Writes the Prometheus text to `path` atomically (e.g. for node_exporter's textfile collector).
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_metrics())
+    os.replace(tmp_path, path)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """
+    Starts the METRICS_PORT endpoint and/or METRICS_FILE writer once per process.
+    Does nothing when metrics are disabled. Safe to call on every Streamlit rerun.
+    """
+    global _exporters_started
+    if not _enabled or _exporters_started:
+        return
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        port = os.getenv("METRICS_PORT")
+        if port:
+            server = ThreadingHTTPServer((os.getenv("METRICS_HOST", "127.0.0.1"), int(port)), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+            log_event("metrics_endpoint_started", port=int(port))
+        path = os.getenv("METRICS_FILE")
+        if path:
+            interval = float(os.getenv("METRICS_FILE_INTERVAL", "15"))
+
+            def write_periodically():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        write_metrics_file(path)
+                    except OSError as e:
+                        log_event("metrics_file_error", level=logging.WARNING, path=path, error=str(e))
+
+            threading.Thread(target=write_periodically, name="metrics-file", daemon=True).start()
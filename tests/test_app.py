@@ -0,0 +1,53 @@
+# tests/test_app.py
+"""
+Drives app.py headlessly through Streamlit's AppTest harness against the stub backend.
+"""
+import os
+
+import pytest
+
+from conftest import ROOT
+
+pytest.importorskip("streamlit.testing.v1")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    from streamlit.testing.v1 import AppTest
+    import ai_feedback
+    from llm_backends import StubBackend
+
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    monkeypatch.setenv("FEEDBACK_CACHE_DISABLED", "1")
+    monkeypatch.delenv("SESSION_STORE", raising=False)
+    monkeypatch.delenv("SEMANTIC_CACHE", raising=False)
+    ai_feedback.set_backend(StubBackend(latency=0, tokens_per_second=0, seed=0))
+    yield AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=30).run()
+    ai_feedback.set_backend(None)
+
+
+def click(at, label):
+    next(b for b in at.button if label in b.label).click().run()
+
+
+def test_submit_streams_feedback_and_records_scores(app):
+    app.text_area[0].input("I split the release into milestones and we shipped on time.").run()
+    click(app, "Get Feedback")
+
+    assert not app.exception
+    assert app.session_state.stage == "reviewing"
+    assert "Communication Clarity" in app.session_state.feedback
+    # The per-criterion scores are what next_question() weights the draw with
+    assert len(app.session_state.scored_feedback) == 1
+    assert app.session_state.scored_feedback[0].communication_clarity.score is not None
+
+
+def test_next_question_after_feedback_returns_to_answering(app):
+    app.text_area[0].input("I split the release into milestones and we shipped on time.").run()
+    click(app, "Get Feedback")
+    first_question = app.session_state.current_question
+    click(app, "Next Question")
+
+    assert not app.exception
+    assert app.session_state.stage == "answering"
+    assert app.session_state.current_question != first_question
@@ -0,0 +1,82 @@
+# tests/test_batch_grading.py
+import asyncio
+import io
+import time
+
+from batch_grading import TokenBucket, _read_jsonl, grade_many, grade_stream
+from llm_backends import StubBackend
+
+
+def items(count):
+    return [{"id": str(i), "question": "Tell me about yourself.", "answer": f"Answer number {i}."}
+            for i in range(count)]
+
+
+def grade(batch, **kwargs):
+    kwargs.setdefault("use_cache", False)
+    kwargs.setdefault("base_delay", 0.001)
+    return asyncio.run(grade_many(batch, **kwargs))
+
+
+def test_transient_errors_are_retried():
+    backend = StubBackend(latency=0, tokens_per_second=0, error_rate=0.3, seed=1)
+    results = grade(items(30), backend=backend, retries=10)
+    assert [r.index for r in results] == list(range(30))
+    assert all(r.error is None and r.feedback for r in results)
+    assert any(r.attempts > 1 for r in results)
+
+
+def test_errors_are_reported_per_item_once_retries_run_out():
+    backend = StubBackend(latency=0, tokens_per_second=0, error_rate=0.5, seed=2)
+    results = grade(items(30), backend=backend, retries=0)
+    failed = [r for r in results if r.error is not None]
+    assert failed and len(failed) < 30
+    assert all(r.error.startswith("TransientBackendError") and r.attempts == 1 for r in failed)
+
+
+def test_structured_grading_parses_scores():
+    backend = StubBackend(latency=0, tokens_per_second=0, seed=0)
+    (result,) = grade(items(1), backend=backend, structured=True)
+    assert result.result.source == "json"
+    assert result.result.communication_clarity.score is not None
+
+
+def test_invalid_items_and_lines_are_reported():
+    lines = io.StringIO('{"question": "Q?", "answer": "A."}\n{broken\n\n{"question": "Q?"}\n')
+    results = grade(_read_jsonl(lines), backend=StubBackend(latency=0, tokens_per_second=0))
+    assert results[0].error is None
+    assert results[1].error.startswith("Invalid JSON on line 2:")
+    assert results[2].error == "Item needs non-empty 'question' and 'answer' fields"
+
+
+def test_token_bucket_limits_the_start_rate():
+    async def take(count):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # The first token is available at once, the other 10 arrive at 50 per second
+    assert asyncio.run(take(11)) >= 0.18
+
+
+def test_slow_input_does_not_stall_items_in_flight():
+    finished = []
+
+    def slow_items():
+        yield {"question": "Q?", "answer": "First answer."}
+        time.sleep(0.5)  # A blocking read, like waiting on stdin
+        finished.append(len(results_so_far))
+        yield {"question": "Q?", "answer": "Second answer."}
+
+    results_so_far = []
+
+    async def run():
+        backend = StubBackend(latency=0.05, tokens_per_second=0)
+        async for result in grade_stream(slow_items(), backend=backend, use_cache=False):
+            results_so_far.append(result)
+
+    asyncio.run(run())
+    assert len(results_so_far) == 2
+    assert finished == [1]  # The first item was graded and yielded while the second was being read
@@ -0,0 +1,89 @@
+# tests/test_feedback_cache.py
+import pytest
+
+import feedback_cache
+from feedback_cache import FeedbackCache, make_cache_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(feedback_cache.time, "time", clock)
+    return clock
+
+
+def test_key_ignores_case_and_whitespace_but_not_model_or_prompt_version():
+    key = make_cache_key("gemini", "v2", "Tell me about yourself.", "I am  a\nDeveloper")
+    assert key == make_cache_key("gemini", "v2", "Tell me about yourself.", "i am a developer")
+    assert key != make_cache_key("gemini", "v3", "Tell me about yourself.", "i am a developer")
+    assert key != make_cache_key("other-model", "v2", "Tell me about yourself.", "i am a developer")
+
+
+def test_disk_tier_survives_a_restart(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    FeedbackCache(path).set("k", "feedback")
+    cache = FeedbackCache(path)
+    assert cache.get("k") == "feedback"
+    assert cache.get("k") == "feedback"
+    assert cache.stats()["hits_disk"] == 1
+    assert cache.stats()["hits_memory"] == 1
+
+
+def test_entries_expire_after_the_ttl_in_both_tiers(tmp_path, clock):
+    cache = FeedbackCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    cache.set("k", "feedback")
+    clock.now += 30
+    assert cache.get("k") == "feedback"
+    clock.now += 31  # Reads don't extend the TTL
+    assert cache.get("k") is None
+    assert cache.stats()["disk_items"] == 0
+
+
+def test_memory_tier_evicts_least_recently_used(clock):
+    cache = FeedbackCache(path=None, max_memory_items=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_disk_tier_is_trimmed_by_last_access(tmp_path, clock):
+    cache = FeedbackCache(str(tmp_path / "cache.sqlite3"), max_memory_items=1, max_disk_items=2)
+    cache.set("a", "1")
+    clock.now += 1
+    cache.set("b", "2")
+    clock.now += 1
+    assert cache.get("a") == "1"  # Read from disk, so "b" is now the least recently used
+    clock.now += 1
+    cache.set("c", "3")
+    assert cache.stats()["disk_items"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+
+def test_memory_hits_keep_hot_entries_on_disk(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = FeedbackCache(path, max_disk_items=2)
+    cache.set("hot", "1")
+    clock.now += 1
+    cache.set("cold", "2")
+    clock.now += 1
+    assert cache.get("hot") == "1"  # Memory-tier hit
+    clock.now += 1
+    cache.set("new", "3")  # Trims one entry: the cold one, not the hot one
+    restarted = FeedbackCache(path)
+    assert restarted.get("hot") == "1"
+    assert restarted.get("cold") is None
+    assert cache.stats()["disk_evictions"] == 1
+    assert cache.stats()["memory_evictions"] == 0
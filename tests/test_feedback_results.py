@@ -0,0 +1,76 @@
+# tests/test_feedback_results.py
+import json
+
+from feedback_results import CRITERION_NAMES, FeedbackResult, parse_feedback
+
+MARKDOWN = """**Feedback for "Tell me about yourself."**
+- **Communication Clarity:** (4/5) Clear, with a few vague phrases.
+- **Answer Structure:** 2/5 - Jumps between topics.
+- **Professional Tone:** (5/5) Confident and respectful.
+- **Completeness/Relevance:** Covers the main points.
+- **Technical Coverage (optional):** Not applicable.
+
+**Suggestion for Improvement:**
+- Use the STAR method.
+"""
+
+
+def json_feedback(**overrides):
+    data = {name: {"score": 3, "comment": f"{name} comment"} for name in CRITERION_NAMES}
+    data["technical_coverage"] = {"score": None, "comment": "Not applicable."}
+    data["suggestion"] = "Add a measurable result."
+    data.update(overrides)
+    return json.dumps(data)
+
+
+def test_json_is_parsed_with_scores():
+    result = parse_feedback(json_feedback())
+    assert result.source == "json"
+    assert result.answer_structure.score == 3
+    assert result.technical_coverage.score is None
+    assert result.suggestion == "Add a measurable result."
+
+
+def test_fenced_json_is_parsed():
+    result = parse_feedback("```json\n" + json_feedback() + "\n```")
+    assert result.source == "json"
+
+
+def test_out_of_range_json_scores_are_dropped():
+    result = parse_feedback(json_feedback(communication_clarity={"score": 9, "comment": "Too high"}))
+    assert result.communication_clarity.score is None
+    assert result.communication_clarity.comment == "Too high"
+
+
+def test_markdown_scores_comments_and_suggestion():
+    result = parse_feedback(MARKDOWN)
+    assert result.source == "markdown"
+    assert result.communication_clarity.score == 4
+    assert result.communication_clarity.comment == "Clear, with a few vague phrases."
+    assert result.answer_structure.score == 2
+    assert result.professional_tone.score == 5
+    assert result.completeness_relevance.score is None
+    assert result.technical_coverage.comment == "Not applicable."
+    assert result.suggestion == "Use the STAR method."
+
+
+def test_invalid_json_falls_back_to_markdown():
+    result = parse_feedback("{not json\n" + MARKDOWN)
+    assert result.source == "markdown"
+    assert result.communication_clarity.score == 4
+
+
+def test_unparseable_text_is_empty_and_never_raises():
+    for text in ("", None, "The model said something unrelated."):
+        assert parse_feedback(text).source == "empty"
+
+
+def test_row_round_trip():
+    result = parse_feedback(MARKDOWN)
+    assert FeedbackResult.from_row(result.to_row()) == result
+
+
+def test_to_markdown_is_parsed_back_to_the_same_scores():
+    result = parse_feedback(json_feedback())
+    again = parse_feedback(result.to_markdown())
+    assert [c.score for _, _, c in again.criteria()] == [c.score for _, _, c in result.criteria()]
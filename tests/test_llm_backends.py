@@ -0,0 +1,40 @@
+# tests/test_llm_backends.py
+import io
+
+from feedback_results import parse_feedback
+from llm_backends import HTTPBackend, StubBackend
+
+
+class ChunkedResponse(io.BytesIO):
+    """
+    HTTP response stand-in whose read1() returns a few bytes at a time.
+    """
+
+    def read1(self, size=-1):
+        return self.read(3)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_http_stream_keeps_multibyte_characters_split_across_reads():
+    text = "Très bien — clear answer ✓"
+    backend = HTTPBackend()
+    backend._post = lambda path, payload: ChunkedResponse(text.encode("utf-8"))
+    assert "".join(backend.stream("prompt")) == text
+
+
+def test_stub_markdown_feedback_carries_scores():
+    feedback = StubBackend(latency=0, tokens_per_second=0).generate("Question and answer")
+    result = parse_feedback(feedback)
+    assert result.source == "markdown"
+    assert all(c.score is not None for name, _, c in result.criteria() if name != "technical_coverage")
+
+
+def test_stub_is_deterministic_per_prompt():
+    backend = StubBackend(latency=0, tokens_per_second=0)
+    assert backend.generate("same prompt") == backend.generate("same prompt")
+    assert "".join(backend.stream("same prompt")) == backend.generate("same prompt")
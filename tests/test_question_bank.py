@@ -0,0 +1,63 @@
+# tests/test_question_bank.py
+import pytest
+
+from feedback_results import parse_feedback
+from question_bank import InMemoryQuestionBank, Question, QuestionSession, weakness_weights
+
+
+def make_bank():
+    questions = [Question(id=f"s{i}", text=f"Structure question {i}", category="behavioral",
+                          criteria=("answer_structure",)) for i in range(5)]
+    questions += [Question(id=f"t{i}", text=f"Technical question {i}", category="technical",
+                           criteria=("technical_coverage",)) for i in range(5)]
+    return InMemoryQuestionBank(questions)
+
+
+def test_no_question_repeats_within_a_pass():
+    bank = make_bank()
+    session = QuestionSession(bank, seed=3)
+    asked = [session.next().id for _ in range(len(bank.ids()))]
+    assert sorted(asked) == sorted(bank.ids())
+
+
+def test_no_back_to_back_repeat_across_passes():
+    session = QuestionSession(make_bank(), seed=0)
+    previous = None
+    for _ in range(200):
+        question_id = session.next().id
+        assert question_id != previous
+        previous = question_id
+
+
+def test_weighted_draw_still_never_repeats_within_a_pass():
+    bank = make_bank()
+    session = QuestionSession(bank, seed=1)
+    weights = {"technical_coverage": 5.0, "answer_structure": 1.0}
+    asked = [session.next(weights=weights).id for _ in range(len(bank.ids()))]
+    assert sorted(asked) == sorted(bank.ids())
+    # Weak criterion first: the technical questions are mostly drawn before the structure ones
+    assert sum(question_id.startswith("t") for question_id in asked[:5]) >= 3
+
+
+def test_filters_and_weights_combine():
+    session = QuestionSession(make_bank(), seed=2, category="behavioral")
+    asked = {session.next(weights={"technical_coverage": 5.0}).id for _ in range(5)}
+    assert asked == {f"s{i}" for i in range(5)}
+
+
+def test_criterion_filter_with_weights():
+    session = QuestionSession(make_bank(), seed=2, criterion="answer_structure")
+    asked = {session.next(weights={"technical_coverage": 5.0, "answer_structure": 1.0}).id for _ in range(5)}
+    assert asked == {f"s{i}" for i in range(5)}
+
+
+def test_empty_filter_result_raises_lookup_error():
+    with pytest.raises(LookupError):
+        QuestionSession(make_bank(), category="nonexistent").next()
+
+
+def test_weakness_weights_favour_low_scores():
+    low = parse_feedback("- **Answer Structure:** (1/5) Hard to follow.\n- **Professional Tone:** (5/5) Confident.")
+    weights = weakness_weights([low])
+    assert weights == {"answer_structure": 5, "professional_tone": 1}
+    assert weakness_weights([]) == {}
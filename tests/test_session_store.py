@@ -0,0 +1,44 @@
+# tests/test_session_store.py
+import session_store
+from session_store import MemorySessionStore, SQLiteSessionStore, create_session_store
+
+
+def test_memory_store_returns_copies_and_evicts_least_recently_used():
+    store = MemorySessionStore(max_sessions=2)
+    data = {"stage": "answering", "scored_feedback": []}
+    store.save("a", data)
+    data["stage"] = "changed"
+    assert store.load("a")["stage"] == "answering"
+
+    store.save("b", {})
+    store.load("a")
+    store.save("c", {})
+    assert store.load("b") is None
+    assert store.load("a") is not None
+    assert store.evictions == 1
+
+
+def test_memory_store_expires_sessions(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    store = MemorySessionStore(ttl_seconds=10)
+    store.save("a", {"stage": "reviewing"})
+    now[0] += 11
+    assert store.load("a") is None
+    assert len(store) == 0
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    SQLiteSessionStore(path).save("a", {"stage": "reviewing", "feedback": "Good"})
+    other = SQLiteSessionStore(path)
+    assert other.load("a") == {"stage": "reviewing", "feedback": "Good"}
+    other.delete("a")
+    assert other.load("a") is None
+    assert len(other) == 0
+
+
+def test_create_session_store_defaults_to_none(monkeypatch):
+    monkeypatch.delenv("SESSION_STORE", raising=False)
+    assert create_session_store() is None
+    assert isinstance(create_session_store("memory"), MemorySessionStore)
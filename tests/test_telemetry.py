@@ -0,0 +1,70 @@
+# tests/test_telemetry.py
+import pytest
+
+import telemetry
+from telemetry import MetricsRegistry, percentile
+
+
+@pytest.mark.parametrize("values, pct, expected", [
+    ([1, 2, 3, 4, 5], 50, 3),
+    (list(range(1, 31)), 95, 29),
+    (list(range(1, 21)), 95, 19),
+    (list(range(1, 101)), 7, 7),
+    (list(range(1, 101)), 99, 99),
+    ([5, 1, 3], 100, 5),
+    ([4], 1, 4),
+])
+def test_percentile_is_nearest_rank(values, pct, expected):
+    assert percentile(values, pct) == expected
+
+
+def test_snapshot_and_prometheus_text():
+    registry = MetricsRegistry()
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        registry.observe("llm_call", seconds)
+    registry.increment("errors_total", stage="llm_call", error="TimeoutError")
+    registry.increment("blocked_prompts_total")
+
+    stats = registry.snapshot()["stages"]["llm_call"]
+    assert stats["count"] == 4
+    assert stats["p50_s"] == 0.2
+    assert stats["p99_s"] == 0.4
+
+    text = registry.render_prometheus()
+    assert 'interview_coach_stage_duration_seconds{stage="llm_call",quantile="0.5"} 0.2' in text
+    assert 'interview_coach_stage_duration_seconds_count{stage="llm_call"} 4' in text
+    assert 'interview_coach_errors_total{error="TimeoutError",stage="llm_call"} 1' in text
+    assert "interview_coach_blocked_prompts_total 1" in text
+
+
+def test_span_counts_errors_only_when_enabled():
+    registry = telemetry.get_metrics_registry()
+    registry.reset()
+    telemetry.set_metrics_enabled(False)
+    try:
+        with telemetry.span("prompt_build"):
+            pass
+        assert registry.snapshot()["stages"] == {}
+
+        telemetry.set_metrics_enabled(True)
+        with pytest.raises(ValueError):
+            with telemetry.span("prompt_build"):
+                raise ValueError("bad prompt")
+        snapshot = registry.snapshot()
+        assert snapshot["stages"]["prompt_build"]["count"] == 1
+        assert snapshot["counters"]["errors_total"] == [({"stage": "prompt_build", "error": "ValueError"}, 1)]
+    finally:
+        telemetry.set_metrics_enabled(False)
+        registry.reset()
+
+
+def test_export_includes_token_usage():
+    from llm_backends import StubBackend
+    from token_usage import get_usage_tracker
+
+    get_usage_tracker().reset()
+    usage = {}
+    StubBackend(latency=0, tokens_per_second=0).generate("Question and answer", usage=usage)
+    text = telemetry.render_metrics()
+    assert f'interview_coach_llm_input_tokens_total{{model="stub"}} {usage["input_tokens"]}' in text
+    assert f'interview_coach_llm_output_tokens_total{{model="stub"}} {usage["output_tokens"]}' in text
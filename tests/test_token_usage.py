@@ -0,0 +1,29 @@
+# tests/test_token_usage.py
+from token_usage import TokenUsageTracker, estimate_cost, estimate_tokens
+
+
+def test_estimates():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcde") == 2
+    assert estimate_cost("models/gemini-1.5-flash", 1_000_000, 1_000_000) == 0.375
+    assert estimate_cost("stub", 1000, 1000) == 0.0
+
+
+def test_tracker_totals_per_model():
+    tracker = TokenUsageTracker()
+    record = tracker.record("models/gemini-1.5-flash", 1000, 200)
+    tracker.record("models/gemini-1.5-flash", 500, 100, estimated=True)
+    tracker.record("stub", 10, 5)
+    assert record["input_tokens"] == 1000 and record["estimated"] is False
+    totals = tracker.snapshot()["models/gemini-1.5-flash"]
+    assert (totals["requests"], totals["input_tokens"], totals["output_tokens"]) == (2, 1500, 300)
+
+
+def test_prometheus_counters():
+    tracker = TokenUsageTracker()
+    tracker.record("stub", 10, 5)
+    text = tracker.render_prometheus()
+    assert "# TYPE interview_coach_llm_requests_total counter" in text
+    assert 'interview_coach_llm_input_tokens_total{model="stub"} 10' in text
+    assert 'interview_coach_llm_output_tokens_total{model="stub"} 5' in text
+    assert 'interview_coach_llm_cost_usd_total{model="stub"} 0.0' in text
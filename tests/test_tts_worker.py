@@ -0,0 +1,86 @@
+# tests/test_tts_worker.py
+import sys
+import threading
+
+import pytest
+
+voice_input = pytest.importorskip("voice_input")
+
+
+class FakeEngine:
+    """
+    Stands in for pyttsx3: runAndWait() blocks until the test releases it.
+    """
+
+    def __init__(self):
+        self.spoken = []
+        self.saved = []
+        self.release = threading.Event()
+
+    def connect(self, name, callback):
+        pass
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def save_to_file(self, text, path):
+        self.saved.append(text)
+        with open(path, "wb") as f:
+            f.write(b"RIFF fake wav")
+
+    def runAndWait(self):
+        self.release.wait(5)
+
+    def stop(self):
+        self.release.set()
+
+
+@pytest.fixture
+def worker(monkeypatch, tmp_path):
+    engine = FakeEngine()
+    monkeypatch.setattr(voice_input.pyttsx3, "init", lambda: engine)
+    monkeypatch.setattr(voice_input, "_can_play_files", lambda: False)
+    worker = voice_input.TTSWorker(cache_dir=str(tmp_path))
+    assert worker.wait_until_ready(5)
+    yield worker, engine
+    engine.release.set()
+
+
+def test_speak_block_returns_after_speaking(worker):
+    worker, engine = worker
+    engine.release.set()
+    worker.speak("hello", block=True)
+    assert engine.spoken == ["hello"]
+
+
+def test_stop_releases_blocked_speak_callers(worker):
+    worker, engine = worker
+    worker.speak("first")  # Occupies the worker until released
+    blocked = threading.Thread(target=worker.speak, args=("second",), kwargs={"block": True},
+                               daemon=True)
+    blocked.start()
+    while worker._queue.qsize() == 0 and blocked.is_alive():
+        threading.Event().wait(0.01)
+    worker.stop()
+    blocked.join(2)
+    assert not blocked.is_alive()
+    assert "second" not in engine.spoken
+
+
+def test_cached_file_is_played_without_synthesizing_again(worker, monkeypatch):
+    worker, engine = worker
+    engine.release.set()
+    played = []
+    # Any command that exits 0 stands in for the OS player
+    monkeypatch.setattr(voice_input, "_can_play_files", lambda: True)
+    monkeypatch.setattr(voice_input, "_wav_player_command",
+                        lambda: [sys.executable, "-c", "import sys; sys.exit(0)"])
+    original_play = worker._play_file
+    monkeypatch.setattr(worker, "_play_file", lambda path: played.append(path) or original_play(path))
+
+    worker.prefetch("Great answer.")
+    worker.speak("Great answer.", block=True)
+    worker.speak("Great answer.", block=True)
+    assert engine.saved == ["Great answer."]  # Synthesized once, by the prefetch
+    assert len(played) == 2
+    assert engine.spoken == []  # Never fell back to direct speech
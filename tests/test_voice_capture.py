@@ -0,0 +1,120 @@
+# tests/test_voice_capture.py
+"""
+CapturePipeline on synthetic WAV files (no microphone, no network): quiet noise for
+silence and a loud tone for speech.
+"""
+import array
+import math
+import random
+import re
+import threading
+import time
+import wave
+
+import pytest
+
+sr = pytest.importorskip("speech_recognition")
+from voice_capture import CapturePipeline, WavFrameSource  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+def write_wav(path, parts):
+    """
+    parts: [("silence" | "speech", seconds), ...]
+    """
+    rng = random.Random(0)
+    samples = array.array("h")
+    for kind, seconds in parts:
+        for i in range(int(seconds * SAMPLE_RATE)):
+            tone = 4000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE) if kind == "speech" else 0
+            samples.append(int(tone) + rng.randint(-60, 60))
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return str(path)
+
+
+def capture(path, recognize_fn, **kwargs):
+    pipeline = CapturePipeline(recognize_fn=recognize_fn, recognition_workers=4)
+    result = pipeline.start(WavFrameSource(path), timeout=kwargs.pop("timeout", None), end_silence=None, **kwargs)
+    assert result.wait(30)
+    return result
+
+
+def test_answer_is_transcribed_after_a_pause(tmp_path):
+    path = write_wav(tmp_path / "answer.wav", [("silence", 1.2), ("speech", 2.0), ("silence", 1.5)])
+    result = capture(path, lambda audio: "my answer")
+    assert result.error_kind is None
+    assert result.text == "my answer"
+    assert result.timings["end_to_text_s"] >= 0
+
+
+def test_long_answer_is_cut_at_pauses_and_joined_in_order(tmp_path):
+    path = write_wav(tmp_path / "answer.wav", [
+        ("silence", 1.2), ("speech", 3.2), ("silence", 1.0), ("speech", 4.0), ("silence", 1.0),
+        ("speech", 4.8), ("silence", 1.5),
+    ])
+
+    def recognize(audio):
+        size = len(audio.frame_data)
+        time.sleep(20_000 / size)  # ~0.1-0.2 s; earlier (shorter) segments finish last
+        return str(size)
+
+    result = capture(path, recognize)
+    assert result.error_kind is None
+    assert result.timings["segments"] == 3
+    sizes = [int(size) for size in re.findall(r"\d+", result.text)]
+    assert sizes == sorted(sizes)
+
+
+def test_recording_continues_while_recognition_is_behind(tmp_path):
+    path = write_wav(tmp_path / "answer.wav", [
+        ("silence", 1.2), ("speech", 3.2), ("silence", 1.0), ("speech", 4.0), ("silence", 1.0),
+        ("speech", 4.8), ("silence", 1.5),
+    ])
+    release = threading.Event()
+
+    def recognize(audio):
+        release.wait(10)
+        return str(len(audio.frame_data))
+
+    pipeline = CapturePipeline(recognize_fn=recognize, recognition_workers=4, max_pending_segments=1)
+    result = pipeline.start(WavFrameSource(path), timeout=None, end_silence=None)
+    deadline = time.monotonic() + 10
+    while result.speech_ended_at is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    recorded = result.segments  # Read while the first segment is still in recognition
+    release.set()
+    assert result.wait(30)
+    assert recorded == 3
+    assert result.error_kind is None
+    assert result.timings["queued_segments"] == 2
+    assert len(result.text.split()) == 3
+
+def test_silence_times_out(tmp_path):
+    path = write_wav(tmp_path / "silence.wav", [("silence", 3.0)])
+    result = capture(path, lambda audio: "never called", timeout=1.0)
+    assert result.error_kind == "timeout"
+
+
+def test_unintelligible_speech_is_reported(tmp_path):
+    path = write_wav(tmp_path / "mumble.wav", [("silence", 1.2), ("speech", 2.0), ("silence", 1.0)])
+
+    def recognize(audio):
+        raise sr.UnknownValueError()
+
+    assert capture(path, recognize).error_kind == "unknown_value"
+
+
+def test_recognition_service_errors_are_reported(tmp_path):
+    path = write_wav(tmp_path / "answer.wav", [("silence", 1.2), ("speech", 2.0), ("silence", 1.0)])
+
+    def recognize(audio):
+        raise sr.RequestError("service unavailable")
+
+    result = capture(path, recognize)
+    assert result.error_kind == "request"
+    assert "service unavailable" in result.error
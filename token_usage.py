@@ -0,0 +1,91 @@
+# token_usage.py
+"""
+Per-call and cumulative token accounting for LLM requests, with a cost estimate.
+Backends record every call here; read the totals with get_usage_tracker().snapshot(),
+or as Prometheus counters with render_prometheus().
+"""
+import threading
+
+# USD per 1M tokens (input, output). Prices change; override with TokenUsageTracker(pricing=...).
+PRICING = {
+    "models/gemini-1.5-flash": (0.075, 0.30),
+    "models/gemini-1.5-pro": (1.25, 5.00),
+}
+CHARS_PER_TOKEN = 4  # Rough rule of thumb for English text, used when a backend reports no usage
+
+
+def estimate_tokens(text):
+    """
+    Approximate token count for backends that don't report usage (stub, http).
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def estimate_cost(model_name, input_tokens, output_tokens, pricing=PRICING):
+    """
+    Estimated cost in USD, or 0.0 for models without a known price (e.g. the stub).
+    """
+    input_price, output_price = pricing.get(model_name, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class TokenUsageTracker:
+    """
+    Thread-safe running totals of requests, input/output tokens and estimated cost per model.
+    """
+
+    def __init__(self, pricing=None):
+        self.pricing = pricing or PRICING
+        self._totals = {}  # model -> [requests, input_tokens, output_tokens, cost_usd]
+        self._lock = threading.Lock()
+
+    def record(self, model_name, input_tokens, output_tokens, estimated=False):
+        """
+        Adds one call and returns its usage as a dict (the per-call record handed back to callers).
+        """
+        cost = estimate_cost(model_name, input_tokens, output_tokens, self.pricing)
+        with self._lock:
+            totals = self._totals.setdefault(model_name, [0, 0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += input_tokens
+            totals[2] += output_tokens
+            totals[3] += cost
+        return {"model": model_name, "input_tokens": input_tokens, "output_tokens": output_tokens,
+                "cost_usd": cost, "estimated": estimated}
+
+    def snapshot(self):
+        """
+        Returns {model: {"requests", "input_tokens", "output_tokens", "cost_usd"}}.
+        """
+        with self._lock:
+            return {
+                model: {"requests": t[0], "input_tokens": t[1], "output_tokens": t[2], "cost_usd": t[3]}
+                for model, t in self._totals.items()
+            }
+
+    def render_prometheus(self):
+        """
+        The totals as Prometheus counters labelled by model, in the text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for field, help_text in (("requests", "LLM requests."), ("input_tokens", "Input (prompt) tokens."),
+                                 ("output_tokens", "Output tokens."), ("cost_usd", "Estimated cost in USD.")):
+            name = f"interview_coach_llm_{field}_total"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{model="{model}"}} {usage[field]!r}' for model, usage in sorted(snapshot.items())]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+
+_tracker = TokenUsageTracker()
+
+
+def get_usage_tracker():
+    """
+    Returns the process-wide tracker that all backends record into.
+    """
+    return _tracker
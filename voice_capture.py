@@ -0,0 +1,362 @@
+# voice_capture.py
+"""
+Background voice capture: audio is read in a worker thread in small chunks, pauses are
+detected from the audio energy (the same idea as speech_recognition's pause_threshold),
+and recognition runs in a thread pool so the Streamlit script never blocks on the
+microphone or the network.
+
+Answers have no length cap: the recording is cut into segments at pauses and each segment
+is transcribed as soon as it is complete, concurrently with the rest of the recording. At
+most max_pending_segments segments of one recording are in recognition at a time; if
+recognition falls further behind, later segments wait in memory (counted in
+timings["queued_segments"]) while the microphone keeps being read, so no audio is lost.
+
+The noise-calibrated energy threshold is kept between recordings, so only the first
+recording (or one after recalibrate_after seconds) pays for calibration.
+
+Any object with sample_rate, sample_width, chunk_size and read() can feed the pipeline,
+so a WAV file (WavFrameSource) replaces the microphone for offline benchmarks and tests.
+"""
+import collections
+import threading
+import time
+import warnings
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import speech_recognition as sr
+
+from telemetry import increment, observe, span
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)  # audioop is deprecated in 3.11/3.12 (audioop-lts on 3.13+)
+    import audioop
+
+DEFAULT_PAUSE_THRESHOLD = 0.8  # seconds of non-speaking audio before a phrase is considered complete
+DEFAULT_CALIBRATION_SECONDS = 1.0
+DEFAULT_RECALIBRATE_AFTER = 300.0  # Re-measure ambient noise every 5 minutes
+DEFAULT_END_SILENCE = 3.0  # A pause this long ends the answer
+DEFAULT_MIN_SEGMENT_SECONDS = 3.0  # Shorter pauses don't cut a segment before it is this long
+DEFAULT_MAX_SEGMENT_SECONDS = 20.0  # Cut even without a pause; keeps each recognition request small
+DEFAULT_MAX_PENDING_SEGMENTS = 8  # Segments in recognition at once, per recording
+PRE_ROLL_SECONDS = 0.5  # Audio kept from just before speech starts
+ENERGY_RATIO = 1.5  # Speech must be this much louder than the ambient noise (speech_recognition's default)
+MIN_ENERGY_THRESHOLD = 300  # speech_recognition's default starting threshold
+
+
+class MicrophoneFrameSource:
+    """
+    Reads raw frames from the default (or given) microphone via speech_recognition/PyAudio.
+    """
+
+    def __init__(self, device_index=None, sample_rate=None, chunk_size=1024):
+        self.device_index = device_index
+        self.sample_rate = sample_rate
+        self.sample_width = None
+        self.chunk_size = chunk_size
+        self._microphone = None
+
+    def __enter__(self):
+        # Opened in the capture thread, so a missing PyAudio or microphone becomes a capture error
+        self._microphone = sr.Microphone(device_index=self.device_index, sample_rate=self.sample_rate,
+                                         chunk_size=self.chunk_size)
+        self._microphone.__enter__()
+        self.sample_rate = self._microphone.SAMPLE_RATE
+        self.sample_width = self._microphone.SAMPLE_WIDTH
+        self.chunk_size = self._microphone.CHUNK
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._microphone.__exit__(*exc_info)
+
+    def read(self):
+        return self._microphone.stream.read(self.chunk_size)
+
+
+class WavFrameSource:
+    """
+    Reads frames from a mono WAV file. With realtime=True reading is paced like a live
+    microphone; otherwise the file is consumed as fast as possible. Returns b"" at the end.
+    """
+
+    def __init__(self, path, chunk_size=1024, realtime=False):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.realtime = realtime
+        self._wav = None
+        self.sample_rate = None
+        self.sample_width = None
+
+    def __enter__(self):
+        self._wav = wave.open(self.path, "rb")
+        if self._wav.getnchannels() != 1:
+            self._wav.close()
+            raise ValueError(f"{self.path}: only mono WAV files are supported")
+        self.sample_rate = self._wav.getframerate()
+        self.sample_width = self._wav.getsampwidth()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wav.close()
+
+    def read(self):
+        if self.realtime:
+            time.sleep(self.chunk_size / self.sample_rate)
+        return self._wav.readframes(self.chunk_size)
+
+
+class VoiceCapture:
+    """
+    Handle for one recording + recognition running in the background.
+    `state` moves through "calibrating", "listening", "recording" (alternating with "paused"
+    between segments), "processing" and ends in "done" (text is set) or "error" (error_kind
+    and error are set).
+    """
+
+    def __init__(self):
+        self.state = "calibrating"
+        self.text = None
+        self.error_kind = None  # "timeout", "unknown_value", "request", "capture"
+        self.error = None
+        self.segments = 0  # Segments recorded so far
+        self.timings = {}  # calibration_s, recording_s, end_to_text_s, segments
+        self.speech_ended_at = None  # perf_counter() when the end of the answer was detected
+        self._stop = threading.Event()
+        self._done = threading.Event()
+
+    def stop(self):
+        """
+        Ends the recording early; whatever was captured so far is still transcribed.
+        """
+        self._stop.set()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the transcript (or an error) is available. Returns True if finished.
+        """
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def _finish(self, text=None, error_kind=None, error=None):
+        self.text = text
+        self.error_kind = error_kind
+        self.error = error
+        self.state = "error" if error_kind else "done"
+        self._done.set()
+
+
+class CapturePipeline:
+    """
+    Records answers in a worker thread and transcribes them in a thread pool. Long answers
+    are cut into segments at pauses; segments are transcribed concurrently while recording
+    continues and the transcripts are joined in speaking order.
+    recognize_fn(audio_data) -> str defaults to Google Speech Recognition; pass a stub to
+    benchmark without network access.
+    """
+
+    def __init__(self, recognize_fn=None, pause_threshold=DEFAULT_PAUSE_THRESHOLD,
+                 calibration_seconds=DEFAULT_CALIBRATION_SECONDS, recalibrate_after=DEFAULT_RECALIBRATE_AFTER,
+                 min_segment_seconds=DEFAULT_MIN_SEGMENT_SECONDS, max_segment_seconds=DEFAULT_MAX_SEGMENT_SECONDS,
+                 max_pending_segments=DEFAULT_MAX_PENDING_SEGMENTS, recognition_workers=4):
+        self.recognizer = sr.Recognizer()
+        self.recognize_fn = recognize_fn or self.recognizer.recognize_google
+        self.pause_threshold = pause_threshold
+        self.calibration_seconds = calibration_seconds
+        self.recalibrate_after = recalibrate_after
+        self.min_segment_seconds = min_segment_seconds
+        self.max_segment_seconds = max_segment_seconds
+        self.max_pending_segments = max_pending_segments
+        self.energy_threshold = None
+        self._calibrated_at = None
+        self._executor = ThreadPoolExecutor(max_workers=recognition_workers, thread_name_prefix="speech-recognition")
+
+    def needs_calibration(self):
+        return self.energy_threshold is None or time.monotonic() - self._calibrated_at > self.recalibrate_after
+
+    def reset_calibration(self):
+        self.energy_threshold = None
+
+    def _calibrate(self, source):
+        # Average energy of a short stretch of ambient noise, like Recognizer.adjust_for_ambient_noise
+        chunks = max(1, int(self.calibration_seconds * source.sample_rate / source.chunk_size))
+        energies = []
+        for _ in range(chunks):
+            frame = source.read()
+            if not frame:
+                break
+            energies.append(audioop.rms(frame, source.sample_width))
+        ambient = sum(energies) / len(energies) if energies else 0
+        self.energy_threshold = max(MIN_ENERGY_THRESHOLD, ambient * ENERGY_RATIO)
+        self._calibrated_at = time.monotonic()
+
+    def start(self, source, timeout=8, phrase_time_limit=None, end_silence=DEFAULT_END_SILENCE):
+        """
+        Starts recording from `source` (a frame source, not yet opened) in a worker thread and
+        returns a VoiceCapture immediately. timeout: seconds to wait for speech to start;
+        phrase_time_limit: maximum length of the answer (None for no limit); end_silence:
+        seconds of silence that end the answer (None: only stop() or the end of a file do).
+        """
+        capture = VoiceCapture()
+        threading.Thread(target=self._record, args=(capture, source, timeout, phrase_time_limit, end_silence),
+                         name="voice-capture", daemon=True).start()
+        return capture
+
+    def _record(self, capture, source, timeout, phrase_time_limit, end_silence):
+        pending = []  # Result futures in speaking order
+        # Segments recorded while max_pending_segments are in recognition; the capture thread
+        # never waits for a slot, so the microphone keeps being read when recognition is slow
+        waiting = collections.deque()
+        slots = threading.BoundedSemaphore(self.max_pending_segments)
+        capture.timings["queued_segments"] = 0
+
+        def start_waiting(_=None):
+            # Called by the capture thread after queueing and by each finished recognition
+            while waiting and slots.acquire(blocking=False):
+                try:
+                    audio, result = waiting.popleft()
+                except IndexError:  # Taken by another thread between the check and the pop
+                    slots.release()
+                    break
+                job = self._executor.submit(self._recognize_into, audio, result)
+                job.add_done_callback(finished)
+
+        def finished(_):
+            slots.release()
+            start_waiting()
+
+        try:
+            with source:
+                started = time.perf_counter()
+                if self.needs_calibration():
+                    self._calibrate(source)
+                capture.timings["calibration_s"] = time.perf_counter() - started
+                for frames in self._segments(capture, source, timeout, phrase_time_limit, end_silence):
+                    audio = sr.AudioData(b"".join(frames), source.sample_rate, source.sample_width)
+                    result = Future()
+                    if waiting or not slots.acquire(blocking=False):
+                        capture.timings["queued_segments"] += 1
+                        waiting.append((audio, result))
+                        start_waiting()
+                    else:
+                        self._executor.submit(self._recognize_into, audio, result).add_done_callback(finished)
+                    pending.append(result)
+                    capture.segments = len(pending)
+        except Exception as e:
+            increment("errors_total", stage="voice_capture", error=type(e).__name__)
+            capture._finish(error_kind="capture", error=str(e))
+            return
+        if not pending:
+            capture._finish(error_kind="timeout", error="No speech detected within the timeout period")
+            return
+        capture.speech_ended_at = time.perf_counter()
+        capture.timings["recording_s"] = capture.speech_ended_at - started - capture.timings["calibration_s"]
+        observe("voice_capture", capture.timings["recording_s"])
+        capture.state = "processing"
+
+        texts, request_errors = [], []
+        for future in pending:
+            kind, value = future.result()
+            if kind == "text":
+                texts.append(value)
+            elif kind == "request":
+                request_errors.append(value)
+        capture.timings["end_to_text_s"] = time.perf_counter() - capture.speech_ended_at
+        capture.timings["segments"] = len(pending)
+        if request_errors:
+            capture._finish(error_kind="request", error=request_errors[0])
+        elif not texts:
+            capture._finish(error_kind="unknown_value", error="Speech could not be understood")
+        else:
+            capture._finish(text=" ".join(texts))
+
+    def _segments(self, capture, source, timeout, phrase_time_limit, end_silence):
+        """
+        Yields the answer as lists of frames, cut at pauses of pause_threshold seconds once a
+        segment is at least min_segment_seconds long (or at max_segment_seconds regardless),
+        so each segment can be transcribed while the user keeps talking. Between segments the
+        state is "paused" and only a short pre-roll ring buffer is kept.
+        """
+        seconds_per_chunk = source.chunk_size / source.sample_rate
+        pre_roll = collections.deque(maxlen=max(1, int(PRE_ROLL_SECONDS / seconds_per_chunk)))
+        segment = []
+        capture.state = "listening"
+        waited = spoken = silence = 0.0
+        while not capture._stop.is_set():
+            frame = source.read()
+            if not frame:
+                break  # End of file (offline mode)
+            loud = audioop.rms(frame, source.sample_width) > self.energy_threshold
+            if capture.state != "recording":
+                pre_roll.append(frame)
+                if loud:
+                    capture.state = "recording"
+                    segment.extend(pre_roll)
+                    pre_roll.clear()
+                    silence = 0.0
+                    continue
+                if capture.state == "listening":
+                    waited += seconds_per_chunk
+                    if timeout is not None and waited > timeout:
+                        return
+                else:
+                    silence += seconds_per_chunk
+                    if end_silence is not None and silence >= end_silence:
+                        return
+                continue
+            segment.append(frame)
+            spoken += seconds_per_chunk
+            silence = 0.0 if loud else silence + seconds_per_chunk
+            length = len(segment) * seconds_per_chunk
+            if (silence >= self.pause_threshold and length >= self.min_segment_seconds) \
+                    or length >= self.max_segment_seconds:
+                yield segment
+                segment = []
+                if silence > 0:
+                    capture.state = "paused"
+            if phrase_time_limit is not None and spoken >= phrase_time_limit:
+                break
+            if end_silence is not None and silence >= end_silence:
+                break
+        if segment:
+            yield segment
+
+    def _recognize_into(self, audio, result):
+        result.set_result(self._recognize_segment(audio))
+
+    def _recognize_segment(self, audio):
+        # Returns ("text", transcript), ("unknown_value", None) or ("request", error message)
+        try:
+            with span("speech_recognition"):  # Failures are counted in errors_total too
+                return "text", self.recognize_fn(audio)
+        except sr.UnknownValueError:
+            return "unknown_value", None
+        except Exception as e:  # sr.RequestError or a network error from a custom recognize_fn
+            return "request", str(e)
+
+    def transcribe_file(self, path, timeout=None, phrase_time_limit=None, end_silence=None):
+        """
+        Offline mode: runs a WAV file through the same pipeline and waits for the transcript.
+        """
+        capture = self.start(WavFrameSource(path), timeout=timeout, phrase_time_limit=phrase_time_limit,
+                             end_silence=end_silence)
+        capture.wait()
+        return capture
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_capture_pipeline():
+    """
+    Returns the process-wide pipeline, so calibration carries over between recordings.
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = CapturePipeline()
+    return _pipeline
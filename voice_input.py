@@ -1,64 +1,275 @@
 # voice_input.py
-import speech_recognition as sr
+import functools
+import hashlib
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import wave
+
 import pyttsx3
 import streamlit as st
-import time
+
+from telemetry import span
+from voice_capture import MicrophoneFrameSource, get_capture_pipeline
+
+
+def start_voice_capture():
+    """
+    Starts recording from the microphone in the background and returns a VoiceCapture
+    right away; recognition also runs off the Streamlit thread. Poll capture.finished
+    (or call capture.wait()) and hand the capture to report_voice_capture().
+    """
+    # No length cap: the answer ends after DEFAULT_END_SILENCE seconds of silence or capture.stop()
+    return get_capture_pipeline().start(MicrophoneFrameSource(), timeout=8, phrase_time_limit=None)
+
+
+def report_voice_capture(capture):
+    """
+    Shows the outcome of a finished VoiceCapture in the sidebar.
+    Returns the recognized text or None if an error occurred.
+    """
+    if capture.error_kind == "timeout":
+        st.sidebar.warning("⏳ No speech detected within the timeout period. Please try again.")
+    elif capture.error_kind == "capture":
+        st.sidebar.error(f"🚫 Error capturing audio: {capture.error}. Check your microphone and system permissions.")
+    elif capture.error_kind == "unknown_value":
+        st.sidebar.warning("🤔 Speech Recognition could not understand audio. Please speak more clearly or try again.")
+    elif capture.error_kind == "request":
+        st.sidebar.error(
+            f"🌐 Could not request results from Google Speech Recognition service; {capture.error}. Check your internet connection.")
+    else:
+        st.sidebar.success(f"🎤 You said: \"{capture.text}\"")
+        return capture.text
+    return None
 
 
 def get_voice_input():
     """
-    Captures voice input from the microphone and converts it to text.
+    Captures voice input from the microphone and converts it to text, blocking until done.
     Returns the recognized text or None if an error occurs.
     """
-    r = sr.Recognizer()
-    with sr.Microphone() as source:
-        st.sidebar.info("👂 Listening... Please speak clearly into your microphone.")
-        # Calibrate for ambient noise levels
-        r.pause_threshold = 0.8  # seconds of non-speaking audio before a phrase is considered complete
+    status = st.sidebar.empty()
+    status.info("👂 Listening... Please speak clearly into your microphone.")
+    capture = start_voice_capture()
+    while not capture.wait(0.1):
+        if capture.state == "processing":
+            status.info("🧠 Processing speech...")
+    status.empty()
+    return report_voice_capture(capture)
+
+
+# Synthesized speech is cached here, one WAV file per distinct text
+TTS_CACHE_DIR = os.path.join(".cache", "tts")
+
+
+@functools.lru_cache(maxsize=None)
+def _wav_player_command():
+    # WAV player that ships with the OS: afplay on macOS, PulseAudio/PipeWire/ALSA tools on Linux
+    for command in (["afplay"], ["paplay"], ["pw-play"], ["aplay", "-q"]):
+        if shutil.which(command[0]):
+            return command
+    return None
+
+
+def _can_play_files():
+    return sys.platform == "win32" or _wav_player_command() is not None  # Windows: winsound (stdlib)
+
+
+class TTSWorker:
+    """
+    Long-lived text-to-speech worker. pyttsx3 engines must be driven from the thread that
+    created them, so a single daemon thread owns the engine (initialized once) and processes
+    a queue of texts. Speech is synthesized to a cached WAV file and played with the OS's own
+    player, so repeating the same feedback or question is instant; without a player (or if the
+    file can't be played) the text is spoken directly.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.init_error = None  # Set if pyttsx3 can't start at all (e.g. espeak missing)
+        self.last_error = None  # Set if speaking fails; shown by speak_text() on the next call
+        self._queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._speaking = threading.Event()
+        self._engine = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self._thread.start()
+
+    def _run(self):
         try:
-            r.adjust_for_ambient_noise(source, duration=1)
-            # Listen for audio with a timeout
-            audio = r.listen(source, timeout=8, phrase_time_limit=8)  # Max 8 seconds of phrase
-        except sr.WaitTimeoutError:
-            st.sidebar.warning("⏳ No speech detected within the timeout period. Please try again.")
-            return None
+            self._engine = pyttsx3.init()
+            self._engine.connect("started-word", self._on_word)
         except Exception as e:
-            st.sidebar.error(f"🚫 Error capturing audio: {e}. Check your microphone and system permissions.")
-            return None
-
-    try:
-        st.sidebar.info("🧠 Processing speech...")
-        text = r.recognize_google(audio)
-        st.sidebar.success(f"🎤 You said: \"{text}\"")
-        return text
-    except sr.UnknownValueError:
-        st.sidebar.warning("🤔 Speech Recognition could not understand audio. Please speak more clearly or try again.")
-        return None
-    except sr.RequestError as e:
-        st.sidebar.error(
-            f"🌐 Could not request results from Google Speech Recognition service; {e}. Check your internet connection.")
-        return None
-    finally:
-        # Clear sidebar info after processing
-        st.sidebar.empty()
-
-
-def speak_text(text):
-    """
-    Converts text to speech using pyttsx3.
-    """
-    try:
-        engine = pyttsx3.init()
-        # Optional: Customize voice, speed, volume
-        # You can list available voices with:
-        # voices = engine.getProperty('voices')
-        # for voice in voices:
-        #     print(voice.id, voice.name)
-        # Example to set a female voice (index might vary)
-        # engine.setProperty('voice', voices[1].id)
-
-        engine.say(text)
-        engine.runAndWait()
-    except Exception as e:
-        st.error(
-            f"🔊 Error in Text-to-Speech: {e}. On Linux, you might need to install 'espeak-ng' and 'libespeak1'. On Windows, ensure your audio drivers are up to date.")
\ No newline at end of file
+            self.init_error = e
+        self._ready.set()
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            action, text, done = job
+            try:
+                if self._engine is None:
+                    continue
+                if action == "synthesize":
+                    with span("tts_synthesis"):
+                        self._synthesize(text)
+                elif not self._cancel.is_set():
+                    self._speaking.set()
+                    with span("tts"):
+                        self._speak(text)
+            except Exception as e:
+                self.last_error = e
+            finally:
+                self._speaking.clear()
+                if done is not None:
+                    done.set()
+
+    def _on_word(self, name, location, length):
+        # Lets stop() interrupt direct speech between words
+        if self._cancel.is_set():
+            self._engine.stop()
+
+    def cache_path(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+
+    def _synthesize(self, text):
+        path = self.cache_path(text)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp.wav"
+            self._engine.save_to_file(text, tmp_path)
+            self._engine.runAndWait()
+            if os.path.exists(tmp_path) and os.path.getsize(tmp_path) > 0:
+                os.replace(tmp_path, path)  # Atomic, so a half-written file is never served from the cache
+        return path if os.path.exists(path) else None
+
+    def _speak(self, text):
+        if _can_play_files():
+            path = self._synthesize(text)
+            if path is not None and self._play_file(path):
+                return
+        self._engine.say(text)
+        self._engine.runAndWait()
+
+    def _play_file(self, path):
+        # Returns False if the file couldn't be played, so the caller can speak the text instead
+        if sys.platform == "win32":
+            import winsound
+
+            try:
+                with wave.open(path) as wav:
+                    duration = wav.getnframes() / wav.getframerate()
+                winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            except (OSError, RuntimeError, wave.Error):
+                return False
+            if self._cancel.wait(duration):
+                winsound.PlaySound(None, winsound.SND_PURGE)
+            return True
+        command = _wav_player_command()
+        if command is None:
+            return False
+        try:
+            process = subprocess.Popen(command + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            return False
+        while process.poll() is None:
+            if self._cancel.wait(0.05):
+                process.terminate()
+                process.wait()
+                return True
+        return process.returncode == 0
+
+    def speak(self, text, block=False):
+        """
+        Queues text to be read aloud. Returns immediately unless block=True.
+        """
+        self._cancel.clear()
+        done = threading.Event() if block else None
+        self._queue.put(("speak", text, done))
+        if done is not None:
+            done.wait()
+
+    def prefetch(self, text):
+        """
+        Synthesizes text into the cache in the background so a later speak() starts instantly.
+        """
+        if _can_play_files() and not os.path.exists(self.cache_path(text)):
+            self._queue.put(("synthesize", text, None))
+
+    def stop(self):
+        """
+        Stops the current speech and drops everything still queued to be spoken.
+        """
+        self._cancel.set()
+        try:
+            while True:
+                job = self._queue.get_nowait()
+                if job is not None and job[2] is not None:
+                    job[2].set()  # Release callers blocked in speak(block=True)
+        except queue.Empty:
+            pass
+
+    def is_speaking(self):
+        return self._speaking.is_set()
+
+    def wait_until_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+
+_tts_worker = None
+_tts_worker_lock = threading.Lock()
+
+
+def get_tts_worker():
+    """
+    Returns the process-wide TTS worker, starting it on first use.
+    """
+    global _tts_worker
+    if _tts_worker is None:
+        with _tts_worker_lock:
+            if _tts_worker is None:
+                _tts_worker = TTSWorker()
+    return _tts_worker
+
+
+def _report_tts_error(worker):
+    error = worker.init_error or worker.last_error
+    if error is None:
+        return False
+    st.error(
+        f"🔊 Error in Text-to-Speech: {error}. On Linux, you might need to install 'espeak-ng' and 'libespeak1'. On Windows, ensure your audio drivers are up to date.")
+    worker.last_error = None
+    return True
+
+
+def speak_text(text, block=False):
+    """
+    Reads text aloud using the shared pyttsx3 worker. By default this returns immediately and
+    speech plays in the background, so the page stays responsive; use stop_speaking() to cancel.
+    """
+    worker = get_tts_worker()
+    worker.wait_until_ready(timeout=5)  # Engine start-up is a one-time cost per process
+    if _report_tts_error(worker):
+        return
+    worker.speak(text, block=block)
+    if block:
+        _report_tts_error(worker)
+
+
+def prefetch_speech(text):
+    """
+    Synthesizes text ahead of time (e.g. right after feedback is generated) so reading it aloud is instant.
+    """
+    get_tts_worker().prefetch(text)
+
+
+def stop_speaking():
+    """
+    Cancels any speech in progress or queued.
+    """
+    get_tts_worker().stop()